@@ -0,0 +1,43 @@
+from logging.config import fileConfig
+from alembic import context
+from app.database import engine, Base
+from app import models  # noqa: F401  (registers tables on Base.metadata)
+
+config = context.config
+target_metadata = Base.metadata
+
+# When run from the app (app/migrations.py) a connection is passed in and the
+# app's logging setup is left alone.
+connection = config.attributes.get("connection")
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+def _configure(**kwargs):
+    context.configure(
+        target_metadata=target_metadata,
+        # SQLite can't ALTER most things; batch mode rebuilds the table instead
+        render_as_batch=engine.dialect.name == "sqlite",
+        compare_type=True,
+        **kwargs
+    )
+
+def run_migrations_offline():
+    _configure(url=engine.url.render_as_string(hide_password=False), literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    with engine.connect() as conn:
+        _configure(connection=conn)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
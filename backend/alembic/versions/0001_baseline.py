@@ -0,0 +1,110 @@
+"""baseline schema
+
+Creates the tables that main.py used to create with Base.metadata.create_all.
+Databases created that way already have them, so existing tables are left
+untouched and only missing ones are created.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_if_missing(existing, name, *columns, indexes=()):
+    if name in existing:
+        return
+    op.create_table(name, *columns)
+    for index_name, index_columns, unique in indexes:
+        op.create_index(index_name, name, index_columns, unique=unique)
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    _create_if_missing(
+        existing, "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        indexes=[("ix_users_id", ["id"], False), ("ix_users_email", ["email"], True)],
+    )
+    _create_if_missing(
+        existing, "projects",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String()),
+        sa.Column("document_type", sa.String()),
+        sa.Column("topic", sa.Text()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        indexes=[("ix_projects_id", ["id"], False)],
+    )
+    _create_if_missing(
+        existing, "sections",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), nullable=False),
+        sa.Column("title", sa.String()),
+        sa.Column("content", sa.Text()),
+        sa.Column("order_index", sa.Integer()),
+        indexes=[("ix_sections_id", ["id"], False)],
+    )
+    _create_if_missing(
+        existing, "refinements",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("section_id", sa.Integer(), sa.ForeignKey("sections.id"), nullable=False),
+        sa.Column("prompt", sa.Text()),
+        sa.Column("refined_content", sa.Text()),
+        sa.Column("feedback", sa.String()),
+        sa.Column("comment", sa.Text()),
+        sa.Column("created_at", sa.DateTime()),
+        indexes=[("ix_refinements_id", ["id"], False)],
+    )
+    _create_if_missing(
+        existing, "llm_cache",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("response", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("last_hit_at", sa.DateTime()),
+        indexes=[
+            ("ix_llm_cache_created_at", ["created_at"], False),
+            ("ix_llm_cache_last_hit_at", ["last_hit_at"], False),
+        ],
+    )
+    _create_if_missing(
+        existing, "jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), nullable=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("payload", sa.Text()),
+        sa.Column("progress", sa.Text()),
+        sa.Column("result", sa.Text()),
+        sa.Column("error", sa.Text()),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("locked_by", sa.String()),
+        sa.Column("locked_until", sa.DateTime()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("finished_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        indexes=[
+            ("ix_jobs_id", ["id"], False),
+            ("ix_jobs_user_id", ["user_id"], False),
+            ("ix_jobs_status", ["status"], False),
+        ],
+    )
+
+
+def downgrade():
+    for name in ("jobs", "llm_cache", "refinements", "sections", "projects", "users"):
+        op.drop_table(name)
@@ -0,0 +1,29 @@
+"""hot-path composite indexes
+
+Ownership checks filter projects on (user_id, id), section listings and
+exports filter on project_id and order by order_index, and refinement
+history is read per section in created_at order. None of these columns had
+an index beyond the FK constraint.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_projects_user_id_id", "projects", ["user_id", "id"])
+    op.create_index("ix_sections_project_id_order_index", "sections", ["project_id", "order_index"])
+    op.create_index("ix_refinements_section_id_created_at", "refinements", ["section_id", "created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_refinements_section_id_created_at", table_name="refinements")
+    op.drop_index("ix_sections_project_id_order_index", table_name="sections")
+    op.drop_index("ix_projects_user_id_id", table_name="projects")
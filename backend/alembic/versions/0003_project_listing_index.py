@@ -0,0 +1,25 @@
+"""project listing keyset index
+
+GET /projects pages through a user's projects ordered by (updated_at, id).
+Rows with a NULL updated_at would fall out of the keyset comparison, so
+they are backfilled from created_at first.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE projects SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL")
+    op.create_index("ix_projects_user_id_updated_at_id", "projects", ["user_id", "updated_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_projects_user_id_updated_at_id", table_name="projects")
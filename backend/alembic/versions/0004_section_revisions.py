@@ -0,0 +1,40 @@
+"""section revision history
+
+Section history as zlib-compressed line deltas against the previous
+version, with a full snapshot every few versions. Existing refinements keep
+their refined_content; new ones are stored here instead.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "section_revisions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("section_id", sa.Integer(), sa.ForeignKey("sections.id"), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("source", sa.String()),
+        sa.Column("refinement_id", sa.Integer(), sa.ForeignKey("refinements.id"), nullable=True),
+        sa.Column("size", sa.Integer()),
+        sa.Column("content_hash", sa.String(64)),
+        sa.Column("created_at", sa.DateTime()),
+        sa.UniqueConstraint("section_id", "version", name="uq_section_revisions_section_id_version"),
+    )
+    op.create_index("ix_section_revisions_id", "section_revisions", ["id"])
+
+
+def downgrade():
+    op.drop_index("ix_section_revisions_id", table_name="section_revisions")
+    op.drop_table("section_revisions")
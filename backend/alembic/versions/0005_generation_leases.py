@@ -0,0 +1,34 @@
+"""generation leases
+
+Lease rows used to coalesce identical in-flight generations across API
+workers; a finished row briefly keeps the result for late duplicates.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "generation_leases",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("owner", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("result", sa.Text()),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_generation_leases_expires_at", "generation_leases", ["expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_generation_leases_expires_at", table_name="generation_leases")
+    op.drop_table("generation_leases")
@@ -0,0 +1,132 @@
+"""section content blocks
+
+Sections keep their text parsed into the export block model
+(app.utils.markdown) so DOCX/PPTX rendering does no parsing. Existing
+sections are parsed here in batches, with a copy of the parser as it was
+at this revision so the migration doesn't change when the app's does.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+# --- Frozen copy of app.utils.markdown.parse_blocks at this revision ---
+_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_BULLET = re.compile(r"^\s*[-*+•]\s+(.*)$")
+_NUMBERED = re.compile(r"^\s*\d{1,3}[.)]\s+(.*)$")
+_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_INLINE = re.compile(
+    r"\*\*\*(?P<bi>.+?)\*\*\*"
+    r"|\*\*(?P<b>.+?)\*\*"
+    r"|__(?P<b2>.+?)__"
+    r"|\*(?![\s*])(?P<i>.+?)(?<![\s*])\*"
+    r"|(?<!\w)_(?![\s_])(?P<i2>.+?)(?<![\s_])_(?!\w)"
+)
+
+
+def _add_run(runs, text, style):
+    if not text:
+        return
+    if runs:
+        last = runs[-1]
+        last_text, last_style = (last, "") if isinstance(last, str) else last
+        if last_style == style:
+            runs[-1] = last_text + text if not style else [last_text + text, style]
+            return
+    runs.append(text if not style else [text, style])
+
+
+def _parse_inline(text, style, runs):
+    position = 0
+    for match in _INLINE.finditer(text):
+        _add_run(runs, text[position:match.start()], style)
+        kind = next(name for name, value in match.groupdict().items() if value is not None)
+        added = {"bi": "bi", "b": "b", "b2": "b", "i": "i", "i2": "i"}[kind]
+        combined = "".join(flag for flag in "bi" if flag in style or flag in added)
+        _parse_inline(match.group(kind), combined, runs)
+        position = match.end()
+    _add_run(runs, text[position:], style)
+
+
+def _runs(text):
+    runs = []
+    _parse_inline(text.strip(), "", runs)
+    return runs
+
+
+def parse_blocks(content):
+    blocks = []
+    current = None
+
+    for line in (content or "").replace("\r\n", "\n").split("\n"):
+        if not line.strip():
+            current = None
+            continue
+        heading = _HEADING.match(line)
+        if heading:
+            blocks.append(["h", len(heading.group(1)), _runs(heading.group(2))])
+            current = None
+            continue
+        if _RULE.match(line):
+            current = None
+            continue
+        for kind, pattern in (("ul", _BULLET), ("ol", _NUMBERED)):
+            item = pattern.match(line)
+            if item:
+                if current is None or current[0] != kind:
+                    current = [kind, []]
+                    blocks.append(current)
+                current[1].append(_runs(item.group(1)))
+                break
+        else:
+            if current is not None and current[0] != "p" and line[:1].isspace():
+                _parse_inline(f" {line.strip()}", "", current[1][-1])
+                continue
+            if current is None or current[0] != "p":
+                current = ["p", []]
+                blocks.append(current)
+            current[1].append(_runs(line))
+    return blocks
+
+
+def upgrade():
+    op.add_column("sections", sa.Column("content_blocks", sa.JSON(none_as_null=True)))
+
+    sections = sa.table(
+        "sections",
+        sa.column("id", sa.Integer),
+        sa.column("content", sa.Text),
+        sa.column("content_blocks", sa.JSON(none_as_null=True)),
+    )
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(sections.c.id, sections.c.content)
+            .where(sections.c.id > last_id, sections.c.content.is_not(None))
+            .order_by(sections.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sections.update().where(sections.c.id == sa.bindparam("section_id")),
+            [{"section_id": row.id, "content_blocks": parse_blocks(row.content)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table("sections") as batch_op:
+        batch_op.drop_column("content_blocks")
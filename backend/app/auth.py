@@ -1,29 +1,139 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import get_history
 from .database import get_db
 from .models import User
 from .utils.security import decode_access_token
 
+load_dotenv()
+
+# Authenticated principals are cached per token for a short TTL (never past
+# the token's own expiry) so authenticated requests skip the user lookup.
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10000))
+# A password change or deletion only evicts the cache of the process that made
+# it, so with several API processes (uvicorn/gunicorn WEB_CONCURRENCY > 1; set
+# it above 1 for multiple replicas too) entries live at most this long instead.
+AUTH_CACHE_SHARED_TTL_SECONDS = int(os.getenv("AUTH_CACHE_SHARED_TTL_SECONDS", 5))
+API_PROCESSES = int(os.getenv("WEB_CONCURRENCY", 1))
+# Build the principal from the signed sub/user_id claims without any DB lookup.
+# This ignores revocation: deleted users and old passwords' tokens keep access
+# until the token expires, whatever the cache settings.
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
+
+def auth_cache_ttl() -> int:
+    if API_PROCESSES > 1:
+        return min(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_SHARED_TTL_SECONDS)
+    return AUTH_CACHE_TTL_SECONDS
+
 security = HTTPBearer()
 
+class PrincipalCache:
+    """Bounded LRU of token -> user columns, with per-user invalidation."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token -> (principal, expires_at)
+        self._tokens_by_user = {}  # user_id -> set of tokens
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _drop(self, token: str):
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal["id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal["id"]]
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(token)
+                self.counters["hits"] += 1
+                return entry[0]
+            if entry is not None:
+                self._drop(token)
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, token: str, principal: dict, token_exp: Optional[float]):
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            if token in self._entries:
+                self._drop(token)
+            self._entries[token] = (principal, expires_at)
+            self._tokens_by_user.setdefault(principal["id"], set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._drop(token)
+            self.counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries)}
+
+principal_cache = PrincipalCache(AUTH_CACHE_MAX_ENTRIES, auth_cache_ttl())
+
+# These only reach this process's cache; see AUTH_CACHE_SHARED_TTL_SECONDS
+@event.listens_for(User, "after_update")
+def _invalidate_on_password_change(mapper, connection, target):
+    if get_history(target, "password_hash").has_changes():
+        principal_cache.invalidate_user(target.id)
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
+
+def _attach(db: Session, principal: dict) -> User:
+    """Turn cached user columns into a User bound to this session, without a query."""
+    user = User(id=principal["id"], email=principal["email"])
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
     token = credentials.credentials
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return _attach(db, principal)
+
     payload = decode_access_token(token)
-    
+
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
         )
-    
+
     email = payload.get("sub")
+    if AUTH_TRUST_TOKEN_CLAIMS and payload.get("user_id") is not None:
+        principal = {"id": payload["user_id"], "email": email}
+        principal_cache.put(token, principal, payload.get("exp"))
+        return _attach(db, principal)
+
     user = db.query(User).filter(User.email == email).first()
-    
+
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
+    principal_cache.put(token, {"id": user.id, "email": user.email}, payload.get("exp"))
     return user
@@ -1,19 +1,138 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
 
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# --- Engine profiles ---
+# DB_PROFILE picks a set of defaults; any DB_* variable below overrides it.
+ENGINE_PROFILES = {
+    # API process: many short requests plus concurrent generation commits
+    "api": {"pool_size": 10, "max_overflow": 20, "statement_timeout_ms": 30000},
+    # Standalone job worker: few long-running jobs
+    "worker": {"pool_size": 5, "max_overflow": 5, "statement_timeout_ms": 120000},
+    # Local development and scripts
+    "small": {"pool_size": 2, "max_overflow": 3, "statement_timeout_ms": 0},
+}
+DB_PROFILE = os.getenv("DB_PROFILE", "api")
+_profile = ENGINE_PROFILES[DB_PROFILE]
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", _profile["pool_size"]))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", _profile["max_overflow"]))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side statement timeout (Postgres); 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", _profile["statement_timeout_ms"]))
+
+# SQLite PRAGMAs applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))  # negative = KiB
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.counters = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def recreate(self):
+        # Keep counters across dispose()/recreate()
+        pool = super().recreate()
+        pool.counters = self.counters
+        pool._stats_lock = self._stats_lock
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            # Only pool exhaustion counts; connect errors etc. propagate uncounted
+            with self._stats_lock:
+                self.counters["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.counters["checkouts"] += 1
+                self.counters["wait_seconds_total"] += waited
+                self.counters["wait_seconds_max"] = max(self.counters["wait_seconds_max"], waited)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.counters)
+        checkouts = stats["checkouts"]
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / checkouts if checkouts else 0.0
+        stats.update(
+            size=self.size(),
+            checked_out=self.checkedout(),
+            checked_in=self.checkedin(),
+            overflow=self.overflow(),
+            max_overflow=self._max_overflow,
+        )
+        return stats
+
+def _engine_kwargs() -> dict:
+    kwargs = {
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "connect_args": {},
+    }
+    is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+    in_memory = is_sqlite and (":memory:" in SQLALCHEMY_DATABASE_URL or SQLALCHEMY_DATABASE_URL.rstrip("/") == "sqlite:")
+    if not in_memory:
+        kwargs.update(
+            poolclass=TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    if is_sqlite:
+        kwargs["connect_args"].update(
+            check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000
+        )
+    elif SQLALCHEMY_DATABASE_URL.startswith("postgresql") and DB_STATEMENT_TIMEOUT_MS > 0:
+        kwargs["connect_args"]["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return kwargs
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_kwargs())
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+            cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        finally:
+            cursor.close()
+
+def pool_stats() -> dict:
+    """Connection pool usage and checkout wait times."""
+    stats = {"profile": DB_PROFILE, "dialect": engine.dialect.name}
+    if isinstance(engine.pool, TimedQueuePool):
+        stats.update(engine.pool.stats())
+    return stats
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -1,10 +1,23 @@
-from fastapi import FastAPI
+import logging
+import os
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routers import auth_router, project_router, generate_router, export_router
+from . import metrics, migrations
+from .routers import auth_router, project_router, generate_router, export_router, stats_router, job_router
+from .services import export_engine, llm_service, templates, render_pool, password_pool
+from .services.job_worker import JobWorker
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Run a job worker inside the API process (disable when using `python -m app.worker`)
+JOB_WORKER_IN_API = os.getenv("JOB_WORKER_IN_API", "true").lower() == "true"
+
+# Apply pending migrations on startup; workers take a lock so only one migrates
+# (disable when running `alembic upgrade head` as a deploy step)
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true"
+
+# Level for the app's own loggers (DEBUG includes per-generation lines)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logging.getLogger("app").setLevel(LOG_LEVEL)
 
 app = FastAPI(title="AI Document Platform")
 
@@ -16,13 +29,50 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Include routers
 app.include_router(auth_router.router)
 app.include_router(project_router.router)
 app.include_router(generate_router.router)
 app.include_router(export_router.router)
+app.include_router(stats_router.router)
+app.include_router(job_router.router)
+
+job_worker = JobWorker() if JOB_WORKER_IN_API else None
+
+@app.on_event("startup")
+async def startup():
+    if DB_AUTO_MIGRATE:
+        migrations.upgrade()
+    # Cached exports of projects deleted while no API process was watching
+    export_engine.prune_orphans()
+    # Parse export templates once so the first export doesn't pay for it
+    templates.warm_up()
+    render_pool.start()
+    password_pool.start()
+    llm_service.start()
+    if job_worker is not None:
+        job_worker.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    if job_worker is not None:
+        await job_worker.stop()
+    await llm_service.close_client()
+    render_pool.shutdown()
+    password_pool.shutdown()
 
 @app.get("/")
 def root():
     return {"message": "AI Document Platform API"}
+
+# --- Prometheus scrape endpoint ---
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(authorization: str = Header(None)):
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if metrics.METRICS_TOKEN and not metrics.operator_authorized(authorization):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    body, content_type = metrics.render_latest()
+    return Response(content=body, headers={"Content-Type": content_type})
@@ -0,0 +1,167 @@
+"""
+Prometheus metrics for the API and job worker, served at /metrics.
+
+Request latency and in-flight gauges come from MetricsMiddleware, labelled
+by route template (never the raw path). LLM timings and token counts come
+from Ollama's response fields, export metrics from export_engine, and
+per-request DB query counts from a cursor-execute hook on the engine.
+"""
+import hmac
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from starlette.routing import Match
+from .database import engine
+
+load_dotenv()
+
+# Serve /metrics and record request metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# If set, /metrics requires "Authorization: Bearer <token>"; /stats/* always
+# requires it and is disabled while it is unset
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+_TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+_RATE_BUCKETS = (1, 2.5, 5, 10, 20, 30, 50, 75, 100, 150, 250, 500)
+_SIZE_BUCKETS = (16e3, 32e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 5e6, 10e6, 25e6)
+_QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to the last byte of the response",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests being handled", ["method", "route"], multiprocess_mode="livesum",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed while handling a request",
+    ["method", "route"], buckets=_QUERY_BUCKETS,
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "LLM backend request time, including streaming",
+    ["model", "backend", "outcome"], buckets=_LLM_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Histogram("llm_prompt_tokens", "Prompt tokens per LLM call", ["model"], buckets=_TOKEN_BUCKETS)
+LLM_COMPLETION_TOKENS = Histogram(
+    "llm_completion_tokens", "Generated tokens per LLM call", ["model"], buckets=_TOKEN_BUCKETS,
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "llm_tokens_per_second", "Generation speed (eval_count / eval_duration)", ["model"], buckets=_RATE_BUCKETS,
+)
+LLM_PROMPT_SECONDS = Histogram(
+    "llm_prompt_eval_seconds", "Prompt processing time before the first token", ["model"], buckets=_LLM_BUCKETS,
+)
+EXPORT_RENDER_SECONDS = Histogram(
+    "export_render_seconds", "Export render time, including render pool queueing",
+    ["document_type"], buckets=_LATENCY_BUCKETS,
+)
+EXPORT_SIZE_BYTES = Histogram("export_size_bytes", "Rendered export size", ["document_type"], buckets=_SIZE_BUCKETS)
+EXPORT_REQUESTS = Counter("export_requests_total", "Exports served", ["document_type", "cache"])
+EXPORT_SECTIONS = Counter(
+    "export_sections_total", "Sections in rendered exports, reused from fragments or rendered",
+    ["document_type", "fragment"],
+)
+
+# Mutable per-request query counter; threadpool calls inherit the context
+_db_queries: ContextVar[Optional[list]] = ContextVar("db_queries", default=None)
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _db_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+def observe_llm_usage(model: str, data: dict):
+    """Record token counts and speed from an Ollama response (or final stream chunk)."""
+    prompt_tokens = data.get("prompt_eval_count")
+    completion_tokens = data.get("eval_count")
+    eval_ns = data.get("eval_duration")
+    if prompt_tokens is not None:
+        LLM_PROMPT_TOKENS.labels(model).observe(prompt_tokens)
+    if data.get("prompt_eval_duration") is not None:
+        LLM_PROMPT_SECONDS.labels(model).observe(data["prompt_eval_duration"] / 1e9)
+    if completion_tokens is not None:
+        LLM_COMPLETION_TOKENS.labels(model).observe(completion_tokens)
+        if eval_ns:
+            LLM_TOKENS_PER_SECOND.labels(model).observe(completion_tokens / (eval_ns / 1e9))
+
+def operator_authorized(authorization: Optional[str]) -> bool:
+    """Whether an Authorization header carries the METRICS_TOKEN bearer (never, if unset)."""
+    expected = f"Bearer {METRICS_TOKEN}".encode("utf-8")
+    return bool(METRICS_TOKEN) and hmac.compare_digest((authorization or "").encode("utf-8"), expected)
+
+def render_latest() -> tuple:
+    """The exposition text and its content type (merged across processes in multiprocess mode)."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no response buffering, so streams are timed to
+    their last chunk). The route template is resolved up front so in-flight
+    gauges cover the whole request; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._index = None  # first path segment -> routes, so only a few are matched
+
+    def _build_index(self, routes) -> dict:
+        index = {}
+        for route in routes:
+            path = getattr(route, "path", "")
+            segment = path.lstrip("/").split("/", 1)[0]
+            index.setdefault("*" if "{" in segment else segment, []).append(route)
+        return index
+
+    def _route(self, scope) -> str:
+        if self._index is None:
+            self._index = self._build_index(scope["app"].router.routes)
+        segment = scope["path"].lstrip("/").split("/", 1)[0]
+        partial = None
+        for route in self._index.get(segment, []) + self._index.get("*", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path  # path matched, method did not (405)
+        return partial or "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        status = "500"
+        counter = [0]
+        token = _db_queries.set(counter)
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _db_queries.reset(token)
+            in_flight.dec()
+            HTTP_REQUEST_SECONDS.labels(method, route, status).observe(time.perf_counter() - start)
+            DB_QUERIES_PER_REQUEST.labels(method, route).observe(counter[0])
@@ -0,0 +1,30 @@
+"""
+Schema migrations (Alembic, see backend/alembic). Run them with
+`alembic upgrade head` from backend/, or let the API do it on startup.
+Startup upgrades take a database lock first, so when several API workers
+start at once one migrates and the rest wait and then find nothing to do.
+"""
+import os
+from alembic import command
+from alembic.config import Config
+from .database import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Key of the Postgres advisory lock held while migrating
+_MIGRATION_LOCK_KEY = 0x616c656d  # "alem"
+
+def _lock(connection):
+    """Serialize upgrades across processes until the migration transaction ends."""
+    if engine.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SELECT pg_advisory_xact_lock({_MIGRATION_LOCK_KEY})")
+    elif engine.dialect.name == "sqlite":
+        # Take the write lock before Alembic reads the current version
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+def upgrade(revision: str = "head"):
+    config = Config(ALEMBIC_INI)
+    with engine.begin() as connection:
+        _lock(connection)
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
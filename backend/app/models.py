@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, JSON, ForeignKey, DateTime, Index, UniqueConstraint, event, update
+from sqlalchemy.orm import relationship, deferred, Session
 from datetime import datetime
 from .database import Base
+from .utils.markdown import parse_blocks
 
 class User(Base):
     __tablename__ = "users"
@@ -27,17 +28,33 @@ class Project(Base):
     owner = relationship("User", back_populates="projects")
     sections = relationship("Section", back_populates="project", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_projects_user_id_id", "user_id", "id"),  # ownership checks
+        Index("ix_projects_user_id_updated_at_id", "user_id", "updated_at", "id"),  # keyset listing
+    )
+
 class Section(Base):
     __tablename__ = "sections"
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     title = Column(String)
-    content = Column(Text)
+    content = deferred(Column(Text))  # loaded only when asked for (undefer / column select)
+    content_blocks = deferred(Column(JSON(none_as_null=True)))  # content parsed for export (utils.markdown block model)
     order_index = Column(Integer)
     
     project = relationship("Project", back_populates="sections")
     refinements = relationship("Refinement", back_populates="section", cascade="all, delete-orphan")
+    revisions = relationship("SectionRevision", back_populates="section", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_sections_project_id_order_index", "project_id", "order_index"),
+    )
+
+@event.listens_for(Section.content, "set")
+def parse_content_blocks(target, value, oldvalue, initiator):
+    """Parse content into its block model whenever it is written, so exports never parse."""
+    target.content_blocks = parse_blocks(value) if value is not None else None
 
 class Refinement(Base):
     __tablename__ = "refinements"
@@ -45,9 +62,88 @@ class Refinement(Base):
     id = Column(Integer, primary_key=True, index=True)
     section_id = Column(Integer, ForeignKey("sections.id"), nullable=False)
     prompt = Column(Text)
-    refined_content = Column(Text)
+    refined_content = deferred(Column(Text))  # legacy full copy; new rows keep it in section_revisions
     feedback = Column(String)  # 'like' or 'dislike'
     comment = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     section = relationship("Section", back_populates="refinements")
+
+    __table_args__ = (
+        Index("ix_refinements_section_id_created_at", "section_id", "created_at"),
+    )
+
+class SectionRevision(Base):
+    __tablename__ = "section_revisions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    section_id = Column(Integer, ForeignKey("sections.id"), nullable=False)
+    version = Column(Integer, nullable=False)  # 1, 2, ... per section
+    kind = Column(String, nullable=False)  # 'snapshot' (full text) or 'delta' (against version - 1)
+    data = deferred(Column(LargeBinary, nullable=False))  # zlib-compressed snapshot or delta
+    source = Column(String)  # 'initial', 'generate', 'refine' or 'rollback'
+    refinement_id = Column(Integer, ForeignKey("refinements.id"), nullable=True)
+    size = Column(Integer)  # uncompressed length of the revision's text
+    content_hash = Column(String(64))  # sha256 of the revision's text
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    section = relationship("Section", back_populates="revisions")
+    refinement = relationship("Refinement")
+
+    __table_args__ = (
+        UniqueConstraint("section_id", "version", name="uq_section_revisions_section_id_version"),
+    )
+
+@event.listens_for(Session, "after_flush")
+def touch_projects_on_section_change(session, flush_context):
+    """Bump Project.updated_at whenever one of its sections is added, edited or removed."""
+    project_ids = {
+        obj.project_id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Section) and obj.project_id is not None
+        and (obj not in session.dirty or session.is_modified(obj))
+    }
+    if project_ids:
+        session.execute(
+            update(Project).where(Project.id.in_(project_ids)).values(updated_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False}
+        )
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+    
+    key = Column(String(64), primary_key=True)  # sha256 of model + prompt + options
+    model = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_hit_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class GenerationLease(Base):
+    __tablename__ = "generation_leases"
+    
+    key = Column(String(64), primary_key=True)  # sha256 of the coalesced request
+    owner = Column(String, nullable=False)  # worker running the generation
+    status = Column(String, nullable=False)  # 'running' or 'done'
+    result = Column(Text)  # JSON result, kept briefly for late duplicates
+    expires_at = Column(DateTime, nullable=False, index=True)  # lease expiry, or result expiry once done
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    kind = Column(String, nullable=False)  # 'generate', 'outline' or 'export'
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, succeeded, failed
+    payload = Column(Text)  # JSON job arguments
+    progress = Column(Text)  # JSON progress snapshot
+    result = Column(Text)  # JSON result
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    locked_by = Column(String)  # worker id holding the lease
+    locked_until = Column(DateTime)  # lease expiry; expired running jobs are reclaimed
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from ..database import get_db
 from ..models import User
-from ..utils.security import verify_password, get_password_hash, create_access_token
+from ..utils.security import check_password_length, create_access_token
+from ..services import password_pool
 from datetime import timedelta
 import os
 
@@ -21,31 +23,65 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress, please retry",
+        headers={"Retry-After": str(password_pool.PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+# Database work runs in the threadpool; the handlers only await the password hashing
+def _find_user(db: Session, email: str) -> User:
+    return db.query(User).filter(User.email == email).first()
+
+def _create_user(db: Session, email: str, password_hash: str) -> User:
+    user = User(email=email, password_hash=password_hash)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+def _update_password_hash(db: Session, user: User, password_hash: str):
+    user.password_hash = password_hash
+    db.commit()
+
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     # Check if user exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await run_in_threadpool(_find_user, db, user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    new_user = User(email=user_data.email, password_hash=hashed_password)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    check_password_length(user_data.password)
+    try:
+        hashed_password = await password_pool.hash_password(user_data.password)
+    except password_pool.PasswordPoolBusy:
+        raise _busy()
+    new_user = await run_in_threadpool(_create_user, db, user_data.email, hashed_password)
     
     return {"message": "User created successfully", "email": new_user.email}
 
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_data.email).first()
-    if not user or not verify_password(user_data.password, user.password_hash):
+async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_user, db, user_data.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    # Read before any commit expires the instance
+    email, user_id = user.email, user.id
+    try:
+        verified, new_hash = await password_pool.verify_password(user_data.password, user.password_hash)
+    except password_pool.PasswordPoolBusy:
+        raise _busy()
+    if not verified:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash is not None:
+        # Stored hash used an older work factor; upgrade it transparently
+        await run_in_threadpool(_update_password_hash, db, user, new_hash)
     
     access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)))
     access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id},
+        data={"sub": email, "user_id": user_id},
         expires_delta=access_token_expires
     )
     
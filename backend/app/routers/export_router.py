@@ -1,44 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models import Project, User
 from ..auth import get_current_user
-from ..services.docx_service import create_docx
-from ..services.pptx_service import create_pptx
-import io
+from ..services import batch_export, export_engine
+from ..utils.file_response import content_disposition, file_download_response
 
 router = APIRouter(prefix="/export", tags=["export"])
 
-@router.get("/{project_id}")
-def export_document(
-    project_id: int,
+class BatchExport(BaseModel):
+    project_ids: Optional[List[int]] = None
+    # Used when project_ids is omitted: a filter over the user's projects
+    document_type: Optional[str] = None
+    title_contains: Optional[str] = None
+    updated_after: Optional[datetime] = None
+    updated_before: Optional[datetime] = None
+
+def _select_project_ids(db: Session, payload: BatchExport, user_id: int) -> List[int]:
+    """The user's exportable projects named by, or matching, the batch request."""
+    limit = batch_export.EXPORT_BATCH_MAX_PROJECTS
+    query = select(Project.id).where(Project.user_id == user_id)
+    if payload.project_ids is not None:
+        requested = list(dict.fromkeys(payload.project_ids))
+        if not requested:
+            raise HTTPException(status_code=400, detail="No projects requested")
+        if len(requested) > limit:
+            raise HTTPException(status_code=400, detail=f"At most {limit} projects per batch export")
+        found = set(db.execute(query.where(
+            Project.id.in_(requested), Project.document_type.in_(export_engine.EXPORT_FORMATS)
+        )).scalars())
+        missing = [pid for pid in requested if pid not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Projects not found or not exportable: {missing}")
+        project_ids = requested
+    else:
+        if payload.document_type is not None:
+            if payload.document_type not in export_engine.EXPORT_FORMATS:
+                raise HTTPException(status_code=400, detail="Unsupported document type")
+            query = query.where(Project.document_type == payload.document_type)
+        else:
+            query = query.where(Project.document_type.in_(export_engine.EXPORT_FORMATS))
+        if payload.title_contains:
+            # Match the text literally: escape LIKE wildcards and the escape character
+            pattern = payload.title_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.where(Project.title.ilike(f"%{pattern}%", escape="\\"))
+        if payload.updated_after is not None:
+            query = query.where(Project.updated_at >= payload.updated_after)
+        if payload.updated_before is not None:
+            query = query.where(Project.updated_at < payload.updated_before)
+        project_ids = db.execute(
+            query.order_by(Project.updated_at.desc(), Project.id.desc()).limit(limit + 1)
+        ).scalars().all()
+        if not project_ids:
+            raise HTTPException(status_code=404, detail="No projects match the filter")
+        if len(project_ids) > limit:
+            raise HTTPException(status_code=400, detail=f"More than {limit} projects match; narrow the filter")
+    return project_ids
+
+# --- EXPORT SEVERAL PROJECTS AS ONE STREAMED ZIP ---
+@router.post("/batch")
+async def export_batch(
+    payload: BatchExport,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    project_ids = await run_in_threadpool(_select_project_ids, db, payload, current_user.id)
+
+    filename = f"projects-{datetime.utcnow():%Y%m%d-%H%M%S}.zip"
+    return StreamingResponse(
+        batch_export.stream_archive(project_ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(filename)},
+    )
+
+@router.get("/{project_id}")
+async def export_document(
+    project_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    # Project and ordered sections, read in the threadpool
+    project, sections_data = await run_in_threadpool(export_engine.load_export, project_id, current_user.id)
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Get all sections ordered
-    sections = sorted(project.sections, key=lambda x: x.order_index)
-    sections_data = [{'title': s.title, 'content': s.content or ''} for s in sections]
-    
-    if project.document_type == "docx":
-        file_bytes = create_docx(project.title, sections_data)
-        filename = f"{project.title}.docx"
-        media_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    else:  # pptx
-        file_bytes = create_pptx(project.title, sections_data)
-        filename = f"{project.title}.pptx"
-        media_type = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+    if project.document_type not in export_engine.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported document type")
     
-    return StreamingResponse(
-        io.BytesIO(file_bytes),
-        media_type=media_type,
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    f, fp = await export_engine.render_cached(project, sections_data)
+    return file_download_response(
+        request, f,
+        media_type=export_engine.media_type(project.document_type),
+        filename=export_engine.export_filename(project.document_type, project.title),
+        etag=fp
     )
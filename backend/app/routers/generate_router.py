@@ -1,153 +1,307 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+import logging
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, contains_eager, undefer
+from pydantic import BaseModel, Field
 from ..database import get_db
-from ..models import Project, Section, Refinement, User
+from ..models import Project, Section, User
 from ..auth import get_current_user
-from ..services.llm_service import generate_content, generate_outline, refine_section
+from ..services.llm_service import (
+    OLLAMA_MODEL, OllamaError, generate_content, generate_outline, stream_content, stream_outline
+)
+from ..services.refine_service import refine_section, stream_refine
+from ..services.generation_service import (
+    build_section_prompt, delete_project, generate_sections, generate_from_outline, save_new_project,
+    save_section_content, save_refinement
+)
+from ..services.revision_service import content_hash
+from ..services.singleflight import make_key, singleflight
+from ..utils.events import encode_event, media_type_for, STREAM_HEADERS
+from typing import Optional
 
 router = APIRouter(prefix="/generate", tags=["generation"])
+logger = logging.getLogger(__name__)
 
 # --- SCHEMAS ---
 class GenerateOutlineRequest(BaseModel):
     project_id: int
+    fresh: bool = False  # bypass the LLM response cache
 
 class GenerateContentRequest(BaseModel):
     section_id: int
+    fresh: bool = False
 
 class RefineRequest(BaseModel):
     section_id: int
     prompt: str
     feedback: str = None
     comment: str = None
+    fresh: bool = False
+
+class GenerateDocumentRequest(BaseModel):
+    topic: str
+    document_type: str = Field(pattern="^(docx|pptx)$")
+    title: Optional[str] = None  # defaults to the topic
+    concurrency: Optional[int] = Field(None, ge=1)
+    fresh: bool = False
+
+# --- Helper functions (run in the threadpool) ---
+def load_owned_project(db: Session, project_id: int, user_id: int) -> Project:
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == user_id
+    ).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+def load_owned_section(db: Session, section_id: int, user_id: int, with_content: bool = False) -> Section:
+    """The section with its project (and content if asked) loaded, so reading them later does no I/O."""
+    query = db.query(Section).join(Project).options(contains_eager(Section.project)).filter(
+        Section.id == section_id,
+        Project.user_id == user_id
+    )
+    if with_content:
+        query = query.options(undefer(Section.content))
+    section = query.first()
+    if not section:
+        raise HTTPException(status_code=404, detail="Section not found")
+    return section
+
+def load_section_titles(db: Session, project_id: int) -> list:
+    return [
+        (s.id, s.title) for s in db.query(Section.id, Section.title).filter(
+            Section.project_id == project_id
+        ).order_by(Section.order_index).all()
+    ]
 
 # --- Generate outline for a project ---
 @router.post("/outline")
-def generate_document_outline(
+async def generate_document_outline(
     request: GenerateOutlineRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    project = db.query(Project).filter(
-        Project.id == request.project_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    project = await run_in_threadpool(load_owned_project, db, request.project_id, current_user.id)
 
-    headings = generate_outline(project.topic, project.document_type)
+    try:
+        headings = await generate_outline(project.topic, project.document_type, use_cache=not request.fresh)
+    except OllamaError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     return {"headings": headings}
 
 # --- Generate content for a single section ---
 @router.post("/content")
-def generate_section_content(
+async def generate_section_content(
     request: GenerateContentRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    section = db.query(Section).join(Project).filter(
-        Section.id == request.section_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not section:
-        raise HTTPException(status_code=404, detail="Section not found")
+    section = await run_in_threadpool(load_owned_section, db, request.section_id, current_user.id)
+
+    section_id, title = section.id, section.title
+    prompt, context = build_section_prompt(section.project.topic, title)
+
+    async def produce():
+        content = await generate_content(prompt, context, use_cache=not request.fresh)
 
-    project = section.project
-    context = f"Document topic: {project.topic}\nSection: {section.title}"
-    prompt = f"Write detailed content for the section titled '{section.title}'"
-    content = generate_content(prompt, context)
+        logger.debug("Generated section %s (%s): %d chars", section_id, title, len(content or ""))
 
-    # Debug print
-    print(f"[GEN] Section: {section.title} | Output: {content}")
+        # Fallback for empty content (for dev/testing)
+        if not content or not content.strip():
+            content = f"[Sample AI content for '{title}']"
 
-    # Fallback for empty content (for dev/testing)
-    if not content or not content.strip():
-        content = f"[Sample AI content for '{section.title}']"
+        await run_in_threadpool(save_section_content, section_id, content)
+        return {"content": content}
 
-    section.content = content
-    db.commit()
+    # Identical concurrent requests (double clicks, retries) share one generation and one save
+    key = make_key("content", section_id, OLLAMA_MODEL, context, prompt, request.fresh)
+    try:
+        result = await singleflight.do(key, produce, fresh=request.fresh)
+    except OllamaError as e:
+        # Nothing was saved; the section keeps its content
+        raise HTTPException(status_code=502, detail=str(e))
     return {
-        "section_id": section.id,
-        "title": section.title,
-        "content": content
+        "section_id": section_id,
+        "title": title,
+        "content": result["content"]
     }
 
+# --- Stream content for a single section (SSE or NDJSON) ---
+@router.post("/content/stream")
+async def stream_section_content(
+    request: GenerateContentRequest,
+    format: str = Query("sse", pattern="^(sse|ndjson)$"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    section = await run_in_threadpool(load_owned_section, db, request.section_id, current_user.id)
+
+    section_id, title = section.id, section.title
+    prompt, context = build_section_prompt(section.project.topic, title)
+
+    async def events():
+        # If the client disconnects, Starlette cancels this generator and the
+        # upstream Ollama request is closed with it; nothing is saved.
+        parts = []
+        try:
+            async for token in stream_content(prompt, context, use_cache=not request.fresh):
+                parts.append(token)
+                yield encode_event("token", {"text": token}, format)
+        except Exception as e:
+            yield encode_event("error", {"detail": str(e)}, format)
+            return
+
+        content = "".join(parts).strip()
+        # Fallback for empty content (for dev/testing)
+        if not content:
+            content = f"[Sample AI content for '{title}']"
+        await run_in_threadpool(save_section_content, section_id, content)
+        yield encode_event("done", {"section_id": section_id, "title": title, "content": content}, format)
+
+    return StreamingResponse(events(), media_type=media_type_for(format), headers=STREAM_HEADERS)
+
 # --- Refine section content ---
 @router.post("/refine")
-def refine_content(
+async def refine_content(
     request: RefineRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    section = db.query(Section).join(Project).filter(
-        Section.id == request.section_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not section:
-        raise HTTPException(status_code=404, detail="Section not found")
+    section = await run_in_threadpool(load_owned_section, db, request.section_id, current_user.id, True)
+
+    section_id, title, original = section.id, section.title, section.content
 
-    refined_content = refine_section(section.content, request.prompt)
+    async def produce():
+        refined_content = await refine_section(original, request.prompt, use_cache=not request.fresh)
 
-    # Debug print
-    print(f"[REFINE] Section: {section.title} | Prompt: {request.prompt} | Output: {refined_content}")
+        logger.debug("Refined section %s (%s) with %r: %d chars",
+                     section_id, title, request.prompt, len(refined_content or ""))
 
-    # Fallback for empty refined content
-    if not refined_content or not refined_content.strip():
-        refined_content = f"[Refined sample for '{section.title}': {request.prompt}]"
+        # Fallback for empty refined content
+        if not refined_content or not refined_content.strip():
+            refined_content = f"[Refined sample for '{title}': {request.prompt}]"
 
-    refinement = Refinement(
-        section_id=section.id,
-        prompt=request.prompt,
-        refined_content=refined_content,
-        feedback=request.feedback,
-        comment=request.comment
+        await run_in_threadpool(
+            save_refinement, section_id, request.prompt, refined_content, request.feedback, request.comment
+        )
+        return {"refined_content": refined_content}
+
+    # Keyed on the content being refined, so a refinement of the new text is not coalesced with the old
+    key = make_key(
+        "refine", section_id, OLLAMA_MODEL, content_hash(original or ""),
+        request.prompt, request.feedback, request.comment, request.fresh
     )
-    db.add(refinement)
-    section.content = refined_content
-    db.commit()
+    try:
+        result = await singleflight.do(key, produce, fresh=request.fresh)
+    except OllamaError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     return {
-        "section_id": section.id,
-        "title": section.title,
-        "refined_content": refined_content
+        "section_id": section_id,
+        "title": title,
+        "refined_content": result["refined_content"]
     }
 
+# --- Stream refined section content (SSE or NDJSON) ---
+@router.post("/refine/stream")
+async def stream_refine_content(
+    request: RefineRequest,
+    format: str = Query("sse", pattern="^(sse|ndjson)$"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    section = await run_in_threadpool(load_owned_section, db, request.section_id, current_user.id, True)
+
+    section_id, title, original = section.id, section.title, section.content
+
+    async def events():
+        parts = []
+        try:
+            async for token in stream_refine(original, request.prompt, use_cache=not request.fresh):
+                parts.append(token)
+                yield encode_event("token", {"text": token}, format)
+        except Exception as e:
+            yield encode_event("error", {"detail": str(e)}, format)
+            return
+
+        refined_content = "".join(parts).strip()
+        # Fallback for empty refined content
+        if not refined_content:
+            refined_content = f"[Refined sample for '{title}': {request.prompt}]"
+        await run_in_threadpool(
+            save_refinement, section_id, request.prompt, refined_content, request.feedback, request.comment
+        )
+        yield encode_event("done", {"section_id": section_id, "title": title, "refined_content": refined_content}, format)
+
+    return StreamingResponse(events(), media_type=media_type_for(format), headers=STREAM_HEADERS)
+
 # --- Bulk generate content for all sections in a project ---
 @router.post("/project/{project_id}/generate")
-def generate_all_sections(
+async def generate_all_sections(
     project_id: int,
+    concurrency: Optional[int] = Query(None, ge=1),
+    fresh: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    sections = db.query(Section).filter(Section.project_id == project.id).all()
+    project = await run_in_threadpool(load_owned_project, db, project_id, current_user.id)
+    sections = await run_in_threadpool(load_section_titles, db, project.id)
     if not sections:
         raise HTTPException(status_code=404, detail="No sections found for this project")
 
-    results = []
-    for section in sections:
-        context = f"Document topic: {project.topic}\nSection: {section.title}"
-        prompt = f"Write detailed content for the section titled '{section.title}'"
-        content = generate_content(prompt, context)
+    # Sections are generated concurrently and committed one by one as they finish
+    results = await generate_sections(project.id, project.topic, sections, concurrency, use_cache=not fresh)
+    failed = [r for r in results if r["status"] == "error"]
+    return {"result": "partial" if failed else "success", "sections": results}
 
-        # Debug print for generation
-        print(f"[BULK GEN] Section: {section.title} | Output: {content}")
+# --- Topic to full document in one pipelined request (NDJSON or SSE) ---
+@router.post("/document")
+async def generate_document(
+    request: GenerateDocumentRequest,
+    format: str = Query("ndjson", pattern="^(sse|ndjson)$"),
+    current_user: User = Depends(get_current_user)
+):
+    title, topic = request.title or request.topic, request.topic
+    project_id = await run_in_threadpool(save_new_project, current_user.id, title, request.document_type, topic)
 
-        # Fallback for empty content (for dev/testing)
-        if not content or not content.strip():
-            content = f"[Sample content for '{section.title}']"
+    async def events():
+        start = time.perf_counter()
+        yield encode_event("project", {
+            "project_id": project_id, "title": title, "document_type": request.document_type
+        }, format)
+        total = failed = 0
+        outline_failed = deleted = False
+        headings = stream_outline(topic, request.document_type, use_cache=not request.fresh)
+        async for event, data in generate_from_outline(
+            project_id, topic, headings, request.concurrency, use_cache=not request.fresh
+        ):
+            if event == "outline_error":
+                outline_failed = True
+                # No sections were saved; don't leave the empty project behind
+                deleted = await run_in_threadpool(delete_project, project_id)
+                yield encode_event("error", {**data, "project_deleted": deleted}, format)
+                continue
+            if event == "section":
+                total += 1
+                failed += data["status"] == "error"
+            yield encode_event(event, data, format)
 
-        section.content = content
-        results.append({
-            "section_id": section.id,
-            "title": section.title,
-            "content": content
-        })
-    db.commit()
+        if outline_failed or total == 0:
+            result = "failed"
+            if not outline_failed:
+                # The outline had no headings
+                deleted = await run_in_threadpool(delete_project, project_id)
+        else:
+            result = "partial" if failed else "success"
+        yield encode_event("done", {
+            "project_id": project_id,
+            "result": result,
+            "sections": total,
+            "failed": failed,
+            "project_deleted": deleted,
+            "elapsed_seconds": round(time.perf_counter() - start, 3),
+        }, format)
 
-    return {"result": "success", "sections": results}
+    return StreamingResponse(events(), media_type=media_type_for(format), headers=STREAM_HEADERS)
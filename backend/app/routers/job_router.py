@@ -0,0 +1,140 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from ..database import get_db, SessionLocal
+from ..models import Job, Project, Section, User
+from ..auth import get_current_user
+from ..services import job_queue, export_engine
+from ..utils.events import encode_event, media_type_for, STREAM_HEADERS
+from ..utils.file_response import file_download_response
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# --- Helper functions ---
+def get_owned_project(db: Session, project_id: int, user_id: int) -> Project:
+    project = db.query(Project).filter(Project.id == project_id, Project.user_id == user_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+def get_owned_job(db: Session, job_id: int, user_id: int) -> Job:
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def _job_snapshot(job_id: int) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        return job_queue.job_to_dict(job) if job else None
+    finally:
+        db.close()
+
+# --- Enqueue bulk section generation ---
+@router.post("/generate/{project_id}", status_code=status.HTTP_202_ACCEPTED)
+def enqueue_generation(
+    project_id: int,
+    concurrency: Optional[int] = Query(None, ge=1),
+    fresh: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    project = get_owned_project(db, project_id, current_user.id)
+    if not db.query(Section.id).filter(Section.project_id == project.id).first():
+        raise HTTPException(status_code=404, detail="No sections found for this project")
+    job = job_queue.enqueue(db, current_user.id, "generate", project.id, {"concurrency": concurrency, "fresh": fresh})
+    return job_queue.job_to_dict(job)
+
+# --- Enqueue outline generation ---
+@router.post("/outline/{project_id}", status_code=status.HTTP_202_ACCEPTED)
+def enqueue_outline(
+    project_id: int,
+    fresh: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    project = get_owned_project(db, project_id, current_user.id)
+    job = job_queue.enqueue(db, current_user.id, "outline", project.id, {"fresh": fresh})
+    return job_queue.job_to_dict(job)
+
+# --- Enqueue an export render ---
+@router.post("/export/{project_id}", status_code=status.HTTP_202_ACCEPTED)
+def enqueue_export(
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    project = get_owned_project(db, project_id, current_user.id)
+    if project.document_type not in export_engine.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported document type")
+    job = job_queue.enqueue(db, current_user.id, "export", project.id)
+    return job_queue.job_to_dict(job)
+
+# --- Poll job status ---
+@router.get("/{job_id}")
+def get_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return job_queue.job_to_dict(get_owned_job(db, job_id, current_user.id))
+
+# --- Subscribe to job progress (SSE or NDJSON) ---
+@router.get("/{job_id}/events")
+async def job_events(
+    job_id: int,
+    format: str = Query("sse", pattern="^(sse|ndjson)$"),
+    interval: float = Query(1.0, ge=0.2, le=30),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    await run_in_threadpool(get_owned_job, db, job_id, current_user.id)
+
+    async def events():
+        # Emits a "progress" event whenever the job row changes and a final
+        # "done" event once it reaches a terminal status.
+        last = None
+        while True:
+            snapshot = await run_in_threadpool(_job_snapshot, job_id)
+            if snapshot is None:
+                yield encode_event("error", {"detail": "Job not found"}, format)
+                return
+            if snapshot["status"] in job_queue.TERMINAL_STATUSES:
+                yield encode_event("done", snapshot, format)
+                return
+            if snapshot != last:
+                yield encode_event("progress", snapshot, format)
+                last = snapshot
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(events(), media_type=media_type_for(format), headers=STREAM_HEADERS)
+
+# --- Download the file produced by an export job ---
+@router.get("/{job_id}/download")
+async def download_job_result(
+    job_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = await run_in_threadpool(get_owned_job, db, job_id, current_user.id)
+    if job.kind != "export":
+        raise HTTPException(status_code=400, detail="Only export jobs produce a download")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    project, sections_data = await run_in_threadpool(export_engine.load_export, job.project_id, current_user.id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Served from the export cache the job filled, unless the project changed since
+    f, fp = await export_engine.render_cached(project, sections_data)
+    return file_download_response(
+        request, f,
+        media_type=export_engine.media_type(project.document_type),
+        filename=export_engine.export_filename(project.document_type, project.title),
+        etag=fp
+    )
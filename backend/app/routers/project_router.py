@@ -1,22 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from fastapi.responses import StreamingResponse
+import base64
+import json
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Body, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
-from docx import Document
-from docx.shared import Pt, RGBColor
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from pptx import Presentation
-from pptx.util import Pt
-from pptx.enum.text import PP_ALIGN
-import io
-import re
 from ..database import get_db
 from ..models import Project, Section, User
 from ..auth import get_current_user
+from ..services import export_engine, project_service, revision_service
+from ..utils.file_response import file_download_response
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+# Largest project accepted by POST /projects/bulk
+PROJECT_IMPORT_MAX_SECTIONS = int(os.getenv("PROJECT_IMPORT_MAX_SECTIONS", 20000))
+
 # --- SCHEMAS ---
 class SectionCreate(BaseModel):
     title: str
@@ -52,13 +54,91 @@ class ProjectResponse(BaseModel):
     class Config:
         from_attributes = True
 
-# --- Helper functions ---
-def clean_markdown_headers(text: str) -> str:
-    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-    return text.replace('**', '').replace('*', '').strip()
+class SectionImport(BaseModel):
+    title: str
+    order_index: Optional[int] = None  # defaults to the position in the list
+    content: Optional[str] = None
+
+class ProjectImport(BaseModel):
+    title: str
+    document_type: str  # 'docx' or 'pptx'
+    topic: str
+    sections: List[SectionImport] = []
+
+class ProjectClone(BaseModel):
+    title: Optional[str] = None  # defaults to the source project's title
+
+class ProjectSummary(BaseModel):
+    id: int
+    title: Optional[str] = None
+    document_type: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    section_count: int
+    class Config:
+        from_attributes = True
 
-def parse_content_to_paragraphs(content: str) -> list:
-    return [p.strip() for p in content.split('\n\n') if p.strip()]
+class ProjectPage(BaseModel):
+    items: List[ProjectSummary]
+    next_cursor: Optional[str] = None
+
+# --- HELPERS ---
+def encode_cursor(updated_at: datetime, project_id: int) -> str:
+    raw = json.dumps([updated_at.isoformat(), project_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, project_id = json.loads(raw)
+        return datetime.fromisoformat(updated_at), int(project_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def section_summaries(db: Session, project_id: int) -> List[SectionResponse]:
+    """Section metadata only; never loads section bodies."""
+    rows = db.execute(
+        select(Section.id, Section.title, Section.order_index)
+        .where(Section.project_id == project_id)
+        .order_by(Section.order_index)
+    ).all()
+    return [SectionResponse.model_validate(row) for row in rows]
+
+# --- LIST PROJECTS (MOST RECENTLY UPDATED FIRST, KEYSET PAGINATED) ---
+@router.get("/", response_model=ProjectPage)
+def list_projects(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    section_count = (
+        select(func.count(Section.id))
+        .where(Section.project_id == Project.id)
+        .correlate(Project)
+        .scalar_subquery()
+    )
+    query = select(
+        Project.id, Project.title, Project.document_type,
+        Project.created_at, Project.updated_at, section_count.label("section_count")
+    ).where(Project.user_id == current_user.id)
+    if cursor:
+        # Continue strictly after the last row of the previous page
+        updated_at, project_id = decode_cursor(cursor)
+        query = query.where(or_(
+            Project.updated_at < updated_at,
+            and_(Project.updated_at == updated_at, Project.id < project_id),
+        ))
+    rows = db.execute(
+        query.order_by(Project.updated_at.desc(), Project.id.desc()).limit(limit + 1)
+    ).all()
+
+    items = [ProjectSummary.model_validate(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
+    return ProjectPage(items=items, next_cursor=next_cursor)
 
 # --- CREATE PROJECT WITH SECTIONS ---
 @router.post("/", response_model=ProjectResponse)
@@ -67,38 +147,19 @@ def create_project(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    new_project = Project(
-        user_id=current_user.id,
-        title=project_data.title,
-        document_type=project_data.document_type,
-        topic=project_data.topic
-    )
-    db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
-
-    # Add sections/slides if present
+    sections = []
     if project_data.config:
         if project_data.document_type == "docx" and project_data.config.sections:
-            for section in project_data.config.sections:
-                new_section = Section(
-                    project_id=new_project.id,
-                    title=section.title,
-                    order_index=section.order_index
-                )
-                db.add(new_section)
+            sections = project_data.config.sections
         elif project_data.document_type == "pptx" and project_data.config.slides:
-            for slide in project_data.config.slides:
-                new_section = Section(
-                    project_id=new_project.id,
-                    title=slide.title,
-                    order_index=slide.order_index
-                )
-                db.add(new_section)
-        db.commit()
-
-    sections_out = db.query(Section).filter(Section.project_id == new_project.id).order_by(Section.order_index).all()
-    sections_response = [SectionResponse.model_validate(section) for section in sections_out]
+            sections = project_data.config.slides
+    new_project, section_rows = project_service.create_project_with_sections(
+        db, current_user.id, project_data.title, project_data.document_type, project_data.topic,
+        [{"title": section.title, "order_index": section.order_index} for section in sections]
+    )
+    db.commit()
+
+    sections_response = [SectionResponse.model_validate(row) for row in section_rows]
     return ProjectResponse(
         id=new_project.id,
         title=new_project.title,
@@ -107,6 +168,60 @@ def create_project(
         sections=sections_response
     )
 
+# --- BULK IMPORT: PROJECT WITH MANY SECTIONS IN ONE TRANSACTION ---
+@router.post("/bulk", response_model=ProjectResponse)
+def import_project(
+    project_data: ProjectImport,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if len(project_data.sections) > PROJECT_IMPORT_MAX_SECTIONS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {PROJECT_IMPORT_MAX_SECTIONS} sections per import"
+        )
+    new_project, section_rows = project_service.create_project_with_sections(
+        db, current_user.id, project_data.title, project_data.document_type, project_data.topic,
+        [
+            {
+                "title": section.title,
+                "order_index": section.order_index if section.order_index is not None else position,
+                "content": section.content,
+            }
+            for position, section in enumerate(project_data.sections)
+        ]
+    )
+    db.commit()
+    return ProjectResponse(
+        id=new_project.id,
+        title=new_project.title,
+        document_type=new_project.document_type,
+        topic=new_project.topic,
+        sections=[SectionResponse.model_validate(row) for row in section_rows]
+    )
+
+# --- CLONE PROJECT SERVER-SIDE ---
+@router.post("/{project_id}/clone", response_model=ProjectResponse)
+def clone_project(
+    project_id: int,
+    clone_data: Optional[ProjectClone] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    project = db.query(Project).filter(Project.id == project_id, Project.user_id == current_user.id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    new_project, section_rows = project_service.clone_project(
+        db, project, current_user.id, clone_data.title if clone_data else None
+    )
+    db.commit()
+    return ProjectResponse(
+        id=new_project.id,
+        title=new_project.title,
+        document_type=new_project.document_type,
+        topic=new_project.topic,
+        sections=[SectionResponse.model_validate(row) for row in section_rows]
+    )
+
 # --- GET PROJECT WITH SECTIONS ---
 @router.get("/{project_id}", response_model=ProjectResponse)
 def get_project(
@@ -117,8 +232,7 @@ def get_project(
     project = db.query(Project).filter(Project.id == project_id, Project.user_id == current_user.id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    sections = db.query(Section).filter(Section.project_id == project.id).order_by(Section.order_index).all()
-    sections_response = [SectionResponse.model_validate(section) for section in sections]
+    sections_response = section_summaries(db, project.id)
     return ProjectResponse(
         id=project.id,
         title=project.title,
@@ -183,103 +297,80 @@ def add_comment(
         raise HTTPException(status_code=404, detail="Section not found")
     return {"message": "Comment saved"}
 
-# --- EXPORT DOCX OR PPTX (WITH LINE-BASED BULLET SPLITTING) ---
-@router.get("/{project_id}/export")
-def export_project(
+# --- SECTION VERSION HISTORY ---
+def get_owned_section(db: Session, project_id: int, section_id: int, user_id: int) -> Section:
+    section = db.query(Section).join(Project).filter(
+        Section.id == section_id,
+        Section.project_id == project_id,
+        Project.user_id == user_id
+    ).first()
+    if not section:
+        raise HTTPException(status_code=404, detail="Section not found")
+    return section
+
+@router.get("/{project_id}/sections/{section_id}/versions")
+def list_section_versions(
     project_id: int,
+    section_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    project = db.query(Project).filter(Project.id == project_id, Project.user_id == current_user.id).first()
+    section = get_owned_section(db, project_id, section_id, current_user.id)
+    return {"section_id": section.id, "versions": revision_service.list_revisions(db, section.id)}
+
+@router.get("/{project_id}/sections/{section_id}/versions/{version}")
+def get_section_version(
+    project_id: int,
+    section_id: int,
+    version: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    section = get_owned_section(db, project_id, section_id, current_user.id)
+    content = revision_service.rebuild(db, section.id, version)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return {"section_id": section.id, "version": version, "content": content}
+
+@router.post("/{project_id}/sections/{section_id}/versions/{version}/rollback")
+def rollback_section(
+    project_id: int,
+    section_id: int,
+    version: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    section = get_owned_section(db, project_id, section_id, current_user.id)
+    restored = revision_service.rollback(db, section, version)
+    if restored is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    content, revision = restored
+    db.commit()
+    return {
+        "section_id": section.id,
+        "restored_from": version,
+        # None when the section already held that text
+        "version": revision.version if revision is not None else None,
+        "content": content
+    }
+
+# --- EXPORT DOCX OR PPTX (WITH LINE-BASED BULLET SPLITTING) ---
+@router.get("/{project_id}/export")
+async def export_project(
+    project_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    project, sections_data = await run_in_threadpool(export_engine.load_export, project_id, current_user.id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    sections = db.query(Section).filter(Section.project_id == project.id).order_by(Section.order_index).all()
-
-    if project.document_type == 'docx':
-        doc = Document()
-        title_head = doc.add_heading(project.title, 0)
-        title_head.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-
-        topic_para = doc.add_paragraph(f"Topic: {project.topic}")
-        topic_para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        topic_para.runs[0].font.italic = True
-        doc.add_paragraph()
-
-        for section in sections:
-            heading = doc.add_heading(section.title, level=1)
-            heading.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-            for run in heading.runs:
-                run.font.color.rgb = RGBColor(31, 56, 100)
-            cleaned_content = clean_markdown_headers(section.content or "[No content]")
-            paragraphs = parse_content_to_paragraphs(cleaned_content)
-            for para_text in paragraphs:
-                paragraph = doc.add_paragraph(para_text)
-                paragraph.paragraph_format.line_spacing = 1.3
-                paragraph.paragraph_format.space_before = Pt(8)
-                paragraph.paragraph_format.space_after = Pt(8)
-                paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-                for run in paragraph.runs:
-                    run.font.size = Pt(12)
-                    run.font.name = "Calibri"
-            doc.add_paragraph()
-
-        bio = io.BytesIO()
-        doc.save(bio)
-        bio.seek(0)
-        return StreamingResponse(
-            iter([bio.getvalue()]),
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers={"Content-Disposition": f"attachment; filename={project.title or 'document'}.docx"}
-        )
-
-    elif project.document_type == 'pptx':
-        prs = Presentation()
-        for section in sections:
-            cleaned_content = clean_markdown_headers(section.content or "")
-            # Split by lines for better bullets
-            lines = [l for l in cleaned_content.split('\n') if l.strip()]
-            slides = []
-            current_title = section.title
-            current_body = []
-            for line in lines:
-                if (line.strip().startswith("**") and line.strip().endswith("**")) or line.strip().endswith("?"):
-                    if current_body:
-                        slides.append((current_title, current_body))
-                        current_body = []
-                    current_title = line.replace("**", "").strip()
-                else:
-                    current_body.append(line.strip())
-            if current_body:
-                slides.append((current_title, current_body))
-
-            # Max lines (bullets) per slide
-            max_lines_per_slide = 5
-            for heading, body_lines in slides:
-                chunks = [body_lines[i:i+max_lines_per_slide] for i in range(0, len(body_lines), max_lines_per_slide)]
-                for idx, chunk in enumerate(chunks):
-                    slide_layout = prs.slide_layouts[1]
-                    slide = prs.slides.add_slide(slide_layout)
-                    slide.shapes.title.text = heading if idx == 0 else f"{heading} (cont'd)"
-                    content_shape = slide.placeholders[1]
-                    text_frame = content_shape.text_frame
-                    text_frame.word_wrap = True
-                    text_frame.clear()
-                    # Each line is a bullet:
-                    for bullet in chunk:
-                        p = text_frame.add_paragraph()
-                        p.text = bullet
-                        p.font.size = Pt(16)
-                        p.font.name = "Calibri"
-                        p.alignment = PP_ALIGN.LEFT
-                        p.level = 0  # Bullet
-
-        pptx_bytes = io.BytesIO()
-        prs.save(pptx_bytes)
-        pptx_bytes.seek(0)
-        return StreamingResponse(
-            iter([pptx_bytes.getvalue()]),
-            media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-            headers={"Content-Disposition": f"attachment; filename={project.title or 'presentation'}.pptx"}
-        )
-    else:
+    if project.document_type not in export_engine.EXPORT_FORMATS:
         raise HTTPException(status_code=400, detail="Unsupported document type")
+
+    f, fp = await export_engine.render_cached(project, sections_data)
+    return file_download_response(
+        request, f,
+        media_type=export_engine.media_type(project.document_type),
+        filename=export_engine.export_filename(project.document_type, project.title),
+        etag=fp
+    )
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from .. import metrics
+from ..database import pool_stats
+from ..auth import principal_cache
+from ..services.llm_cache import llm_cache
+from ..services import render_pool, password_pool
+from ..services.llm_service import backend_pool
+from ..services.singleflight import singleflight
+
+def require_operator(authorization: str = Header(None)):
+    """
+    Internal state (backend hosts, pool and cache counters) is for operators
+    only: callers present the METRICS_TOKEN bearer, and without a configured
+    token these endpoints don't exist.
+    """
+    if not metrics.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not metrics.operator_authorized(authorization):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+router = APIRouter(prefix="/stats", tags=["stats"], dependencies=[Depends(require_operator)])
+
+# --- LLM response cache hit/miss counters ---
+@router.get("/llm-cache")
+def llm_cache_stats():
+    return llm_cache.stats()
+
+# --- Export render pool queue depth and render times ---
+@router.get("/render-pool")
+def render_pool_stats():
+    return render_pool.stats()
+
+# --- Authenticated-principal cache counters ---
+@router.get("/auth-cache")
+def auth_cache_stats():
+    return principal_cache.stats()
+
+# --- Password hashing pool queue depth and rejections ---
+@router.get("/password-pool")
+def password_pool_stats():
+    return password_pool.stats()
+
+# --- Database connection pool usage and checkout waits ---
+@router.get("/db")
+def db_pool_stats():
+    return pool_stats()
+
+# --- Duplicate generations coalesced onto an in-flight leader ---
+@router.get("/singleflight")
+def singleflight_stats():
+    return singleflight.stats()
+
+# --- Per-host LLM backend load, health and latency ---
+@router.get("/llm-backends")
+def llm_backend_stats():
+    return backend_pool.stats()
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, List
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from ..utils.file_response import FILE_CHUNK_SIZE, file_size
+from . import export_engine
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Most projects one batch export may include
+EXPORT_BATCH_MAX_PROJECTS = int(os.getenv("EXPORT_BATCH_MAX_PROJECTS", 500))
+# Projects of one batch being rendered or waiting to be written at once;
+# this bounds the open files and spooled renders a batch holds
+EXPORT_BATCH_CONCURRENCY = int(os.getenv("EXPORT_BATCH_CONCURRENCY", 4))
+
+class _ZipSink:
+    """Unseekable write target for ZipFile; whatever is written is drained into the response."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _entry_name(filename: str, used: set) -> str:
+    """A flat, unique archive path for an export file name."""
+    name = filename.replace("/", "_").replace("\\", "_")
+    stem, dot, extension = name.rpartition(".")
+    n = 1
+    while name in used:
+        n += 1
+        name = f"{stem} ({n}){dot}{extension}"
+    used.add(name)
+    return name
+
+async def _render(project_id: int):
+    project, sections_data = await run_in_threadpool(export_engine.load_export, project_id)
+    if project is None:
+        raise ValueError("Project not found")
+    f, _ = await export_engine.render_cached(project, sections_data)
+    return project, f
+
+async def stream_archive(project_ids: List[int], concurrency: int = EXPORT_BATCH_CONCURRENCY) -> AsyncIterator[bytes]:
+    """
+    Yield a ZIP archive of the projects' exports. Projects are rendered
+    `concurrency` at a time (through the export cache and render pool) and
+    each is written as soon as it is ready, so entries are in completion
+    order. Entries are stored uncompressed (DOCX/PPTX are already deflated)
+    and copied in FILE_CHUNK_SIZE pieces. A project is only rendered once a
+    slot is free, and a slot is freed once its entry is written, so memory
+    does not grow with the number of projects. Projects that fail to render
+    are listed in a trailing errors.txt entry.
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED)
+    slots = asyncio.Semaphore(concurrency)
+    finished = asyncio.Queue()
+    pending = iter(project_ids)
+
+    async def worker():
+        for project_id in pending:
+            await slots.acquire()  # released by the writer below
+            try:
+                project, f = await _render(project_id)
+                await finished.put((project_id, project, f, None))
+            except Exception as e:
+                await finished.put((project_id, None, None, e))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(project_ids)))]
+    used_names = set()
+    errors = []
+    try:
+        for _ in range(len(project_ids)):
+            project_id, project, f, error = await finished.get()
+            try:
+                if error is not None:
+                    logger.warning("Batch export of project %s failed: %s", project_id, error)
+                    errors.append(f"project {project_id}: {error}")
+                    continue
+                filename = export_engine.export_filename(project.document_type, project.title)
+                info = zipfile.ZipInfo(
+                    _entry_name(filename, used_names),
+                    date_time=(project.updated_at or datetime.utcnow()).timetuple()[:6],
+                )
+                info.compress_type = zipfile.ZIP_STORED
+                info.file_size = file_size(f)
+                with archive.open(info, "w") as entry:
+                    while True:
+                        chunk = await run_in_threadpool(f.read, FILE_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        entry.write(chunk)
+                        yield sink.drain()
+            finally:
+                if f is not None:
+                    f.close()
+                slots.release()
+        if errors:
+            archive.writestr("errors.txt", "\n".join(errors) + "\n")
+        archive.close()
+        yield sink.drain()
+    finally:
+        # Client went away (or a write failed): stop rendering and close finished files
+        for task in workers:
+            task.cancel()
+        while not finished.empty():
+            _, _, f, _ = finished.get_nowait()
+            if f is not None:
+                f.close()
@@ -1,27 +1,133 @@
-from docx import Document
-from docx.shared import Pt, Inches
-from typing import List
-import io
+from copy import deepcopy
+from typing import BinaryIO, List, Optional
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import nsdecls, qn
+from lxml import etree
+from .export_cache import FragmentStore
+from .templates import (
+    new_document, TITLE_STYLE, TOPIC_STYLE, HEADING_STYLE, SUBHEADING_STYLE, BODY_STYLE, BULLET_STYLE, NUMBER_STYLE
+)
 
-def create_docx(title: str, sections: List[dict]) -> bytes:
+_LIST_STYLES = {"ul": BULLET_STYLE, "ol": NUMBER_STYLE}
+# Stored section fragments are a run of body elements; parsed inside a wrapper
+_FRAGMENT_OPEN = f"<w:body {nsdecls('w')}>".encode()
+_FRAGMENT_CLOSE = b"</w:body>"
+
+def _add_paragraph(doc, style_id: str, text: str = ""):
+    """
+    Add a paragraph by style id. Passing a style name to add_paragraph scans
+    every style in the document to resolve it, which dominated render time.
+    """
+    paragraph = doc.add_paragraph(text)
+    paragraph._p.style = style_id
+    return paragraph
+
+def _run_prototypes() -> dict:
+    """<w:r> templates per inline style ("", "b", "i", "bi"), each with an empty <w:t>."""
+    prototypes = {}
+    for style in ("", "b", "i", "bi"):
+        run = OxmlElement("w:r")
+        if style:
+            properties = OxmlElement("w:rPr")
+            for flag, tag in (("b", "w:b"), ("i", "w:i")):
+                if flag in style:
+                    properties.append(OxmlElement(tag))
+            run.append(properties)
+        run.append(OxmlElement("w:t"))
+        prototypes[style] = run
+    return prototypes
+
+_RUNS = _run_prototypes()
+
+def _add_runs(paragraph, runs: list):
+    """
+    Append runs by copying a prebuilt <w:r> per style. Run.text and the
+    bold/italic setters place each child by schema order, which cost more
+    than the rest of the render on run-heavy sections.
+    """
+    p = paragraph._p
+    for run in runs:
+        text, style = (run, "") if isinstance(run, str) else run
+        if "\t" in text:
+            added = paragraph.add_run(text)  # tabs become <w:tab/>
+            added.bold = "b" in style or None
+            added.italic = "i" in style or None
+            continue
+        element = deepcopy(_RUNS[style])
+        t = element[-1]
+        t.text = text
+        if text[:1].isspace() or text[-1:].isspace():
+            t.set(qn("xml:space"), "preserve")
+        p.append(element)
+
+def _add_lines(doc, lines: list, style_id: str):
+    """One paragraph; the source's line breaks are kept as breaks."""
+    if len(lines) == 1 and len(lines[0]) == 1 and isinstance(lines[0][0], str):
+        _add_paragraph(doc, style_id, lines[0][0])  # plain text fast path
+        return
+    paragraph = _add_paragraph(doc, style_id)
+    for i, runs in enumerate(lines):
+        if i:
+            paragraph.add_run().add_break()
+        _add_runs(paragraph, runs)
+
+def _add_section(doc, section: dict, style_ids: dict):
+    _add_paragraph(doc, style_ids[HEADING_STYLE], section['title'])
+    blocks = section['blocks'] or [["p", [["[No content]"]]]]
+    for block in blocks:
+        kind = block[0]
+        if kind == "h":
+            _add_lines(doc, [block[2]], style_ids[SUBHEADING_STYLE])
+        elif kind == "p":
+            _add_lines(doc, block[1], style_ids[BODY_STYLE])
+        else:
+            for item in block[1]:
+                _add_lines(doc, [item], style_ids[_LIST_STYLES[kind]])
+    doc.add_paragraph()  # Add spacing
+
+def _body_end(body) -> int:
+    """Index new paragraphs go in at: before the trailing sectPr, if any."""
+    return len(body) - 1 if len(body) and body[-1].tag == qn("w:sectPr") else len(body)
+
+def _splice(body, fragment: bytes):
+    wrapper = parse_xml(_FRAGMENT_OPEN + fragment + _FRAGMENT_CLOSE)
+    end = body.find(qn("w:sectPr"))
+    for element in list(wrapper):
+        if end is None:
+            body.append(element)
+        else:
+            end.addprevious(element)
+
+def create_docx(title: str, sections: List[dict], out: BinaryIO, topic: Optional[str] = None,
+                fragments: Optional[FragmentStore] = None):
     """
-    Create a Word document
-    sections: [{'title': 'Section 1', 'content': 'Content here'}, ...]
+    Create a Word document and write it to out
+    sections: [{'title': 'Section 1', 'blocks': [...]}, ...] (utils.markdown block model)
+    Formatting comes from the template's paragraph styles, not per-run settings;
+    only inline bold/italic are set on runs.
+    With fragments, sections rendered by an earlier export are spliced in from
+    their stored body XML and only new or changed sections are rendered.
     """
-    doc = Document()
-    
-    # Add title
-    title_paragraph = doc.add_heading(title, level=0)
-    title_paragraph.alignment = 1  # Center alignment
-    
-    # Add sections
+    doc = new_document()
+    style_ids = {
+        name: doc.styles[name].style_id
+        for name in (HEADING_STYLE, SUBHEADING_STYLE, BODY_STYLE, BULLET_STYLE, NUMBER_STYLE)
+    }
+
+    doc.add_paragraph(title, style=TITLE_STYLE)
+    if topic:
+        doc.add_paragraph(f"Topic: {topic}", style=TOPIC_STYLE)
+        doc.add_paragraph()
+
+    body = doc.element.body
     for section in sections:
-        doc.add_heading(section['title'], level=1)
-        doc.add_paragraph(section['content'])
-        doc.add_paragraph()  # Add spacing
-    
-    # Save to bytes
-    file_stream = io.BytesIO()
-    doc.save(file_stream)
-    file_stream.seek(0)
-    return file_stream.read()
+        fragment = fragments.get(section) if fragments is not None else None
+        if fragment is not None:
+            _splice(body, fragment)
+            continue
+        start = _body_end(body)
+        _add_section(doc, section, style_ids)
+        if fragments is not None:
+            fragments.put(section, b"".join(etree.tostring(e) for e in body[start:_body_end(body)]))
+
+    doc.save(out)
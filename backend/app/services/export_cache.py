@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import BinaryIO, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", "./export_cache")
+EXPORT_CACHE_ENABLED = os.getenv("EXPORT_CACHE_ENABLED", "true").lower() == "true"
+# Keep each section's rendered XML so re-exports only render changed sections
+EXPORT_FRAGMENTS_ENABLED = os.getenv("EXPORT_FRAGMENTS_ENABLED", "true").lower() == "true"
+
+def fingerprint(renderer: str, document_type: str, title: str, topic: str,
+                updated_at: Optional[datetime], sections: List[dict]) -> str:
+    """
+    Fingerprint of everything that affects a rendered export.
+    renderer should name the pipeline and its version, so layout changes
+    invalidate old artifacts.
+    """
+    material = json.dumps({
+        "renderer": renderer,
+        "document_type": document_type,
+        "title": title,
+        "topic": topic,
+        "updated_at": updated_at.isoformat() if updated_at else None,
+        "sections": [[s["title"], s["blocks"]] for s in sections],
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def _project_dir(project_id: int) -> str:
+    return os.path.join(EXPORT_CACHE_DIR, f"project_{project_id}")
+
+def cached_project_ids() -> List[int]:
+    """Projects that have a cache directory."""
+    try:
+        names = os.listdir(EXPORT_CACHE_DIR)
+    except FileNotFoundError:
+        return []
+    ids = []
+    for name in names:
+        prefix, _, project_id = name.partition("_")
+        if prefix == "project" and project_id.isdigit():
+            ids.append(int(project_id))
+    return ids
+
+def remove_project(project_id: int):
+    """Drop a project's cached artifacts and section fragments."""
+    shutil.rmtree(_project_dir(project_id), ignore_errors=True)
+
+def open_cached(project_id: int, slot: str, fp: str) -> Optional[BinaryIO]:
+    """
+    Open a cached artifact for reading, or return None on a miss.
+    slot names the artifact kind (e.g. "export.docx"); each project keeps at
+    most one artifact per slot. The open handle stays valid even if a newer
+    render replaces the file.
+    """
+    if not EXPORT_CACHE_ENABLED:
+        return None
+    try:
+        return open(os.path.join(_project_dir(project_id), f"{fp}-{slot}"), "rb")
+    except FileNotFoundError:
+        return None
+
+def staging_dir(project_id: int) -> str:
+    """Directory for in-progress renders; on the cache filesystem so store_file can rename."""
+    if not EXPORT_CACHE_ENABLED:
+        return tempfile.gettempdir()
+    directory = _project_dir(project_id)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def _publish(directory: str, tmp_path: str, slot: str, fp: str) -> str:
+    path = os.path.join(directory, f"{fp}-{slot}")
+    os.replace(tmp_path, path)
+    for name in os.listdir(directory):
+        if name.endswith(f"-{slot}") and name != os.path.basename(path):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+    return path
+
+def store(project_id: int, slot: str, fp: str, src: BinaryIO) -> Optional[str]:
+    """
+    Atomically copy a rendered artifact from src (read from its start, left
+    rewound) and drop stale artifacts in the same slot for the project.
+    Returns the cached path.
+    """
+    if not EXPORT_CACHE_ENABLED:
+        return None
+    directory = staging_dir(project_id)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    src.seek(0)
+    with os.fdopen(fd, "wb") as f:
+        shutil.copyfileobj(src, f)
+    src.seek(0)
+    return _publish(directory, tmp_path, slot, fp)
+
+def store_file(project_id: int, slot: str, fp: str, tmp_path: str) -> str:
+    """Move a file rendered into staging_dir() into the cache. Returns the cached path."""
+    return _publish(staging_dir(project_id), tmp_path, slot, fp)
+
+class FragmentStore:
+    """
+    Rendered XML of single sections for one project, keyed by a hash of the
+    section (title and blocks) and everything else that affects its output.
+    Renderers splice stored fragments in and put freshly rendered ones; the
+    store is plain data so it can be handed to a render pool worker.
+    """
+
+    def __init__(self, directory: str, namespace: str):
+        self.directory = directory
+        self.namespace = namespace  # renderer, document type and template
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, section: dict) -> str:
+        material = json.dumps([self.namespace, section["title"], section["blocks"]], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, section: dict) -> Optional[bytes]:
+        name = f"{self.key(section)}.xml"
+        self.used.add(name)
+        try:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, section: dict, data: bytes):
+        name = f"{self.key(section)}.xml"
+        self.used.add(name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass  # removed by a concurrent prune; it is just a miss next time
+
+    def prune(self):
+        """Drop fragments this render did not use (old versions of edited sections)."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".xml") and name not in self.used:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+def fragment_store(project_id: int, renderer: str, document_type: str,
+                   template: Optional[str]) -> Optional[FragmentStore]:
+    """The project's section fragment store, or None when fragments are disabled."""
+    if not (EXPORT_CACHE_ENABLED and EXPORT_FRAGMENTS_ENABLED):
+        return None
+    directory = os.path.join(_project_dir(project_id), "fragments")
+    os.makedirs(directory, exist_ok=True)
+    namespace = json.dumps([renderer, document_type, template])
+    return FragmentStore(directory, namespace)
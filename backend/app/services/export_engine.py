@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+import time
+from typing import BinaryIO, List, Optional, Tuple
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, event, select
+from ..metrics import EXPORT_RENDER_SECONDS, EXPORT_REQUESTS, EXPORT_SECTIONS, EXPORT_SIZE_BYTES
+from ..database import SessionLocal
+from ..models import Project, Section
+from ..utils.markdown import parse_blocks
+from . import export_cache, render_pool, templates
+from .docx_service import create_docx
+from .pptx_service import create_pptx
+
+load_dotenv()
+
+# Renders stay in memory up to this size and spill to a temp file above it
+EXPORT_SPOOL_MAX_BYTES = int(os.getenv("EXPORT_SPOOL_MAX_BYTES", 8 * 1024 * 1024))
+
+# Bump when the DOCX/PPTX layout changes so cached exports are re-rendered
+RENDERER_VERSION = "export_engine-2"
+
+# document_type -> (renderer, media type, fallback file name)
+EXPORT_FORMATS = {
+    "docx": (create_docx, "application/vnd.openxmlformats-officedocument.wordprocessingml.document", "document"),
+    "pptx": (create_pptx, "application/vnd.openxmlformats-officedocument.presentationml.presentation", "presentation"),
+}
+
+def media_type(document_type: str) -> str:
+    return EXPORT_FORMATS[document_type][1]
+
+def export_filename(document_type: str, title: str) -> str:
+    return f"{title or EXPORT_FORMATS[document_type][2]}.{document_type}"
+
+def load_sections(db, project_id: int) -> List[dict]:
+    """
+    A project's section titles and parsed content blocks in order, in the
+    shape render() takes. The raw text is only read for rows whose blocks
+    are missing (written before they existed), which are parsed here.
+    """
+    rows = db.execute(
+        select(
+            Section.title,
+            Section.content_blocks,
+            case((Section.content_blocks.is_(None), Section.content)).label("content"),
+        )
+        .where(Section.project_id == project_id)
+        .order_by(Section.order_index)
+    ).all()
+    return [
+        {
+            "title": row.title,
+            "blocks": row.content_blocks if row.content_blocks is not None else parse_blocks(row.content),
+        }
+        for row in rows
+    ]
+
+def load_export(project_id: int, user_id: Optional[int] = None) -> Tuple[Optional[Project], List[dict]]:
+    """
+    Load a project (detached) and its sections in a session of its own, for
+    callers off the request thread. Returns (None, []) if it doesn't exist
+    or, when user_id is given, isn't owned by that user.
+    """
+    db = SessionLocal()
+    try:
+        project = db.get(Project, project_id)
+        if project is None or (user_id is not None and project.user_id != user_id):
+            return None, []
+        sections_data = load_sections(db, project_id)
+        db.expunge_all()
+        return project, sections_data
+    finally:
+        db.close()
+
+@event.listens_for(Project, "after_delete")
+def _remove_cache_on_delete(mapper, connection, target):
+    export_cache.remove_project(target.id)
+
+def prune_orphans(batch_size: int = 500) -> int:
+    """
+    Remove the cache directories of projects that no longer exist (deleted
+    outside the ORM, or recreated by a render racing the delete). Returns
+    how many were removed.
+    """
+    ids = export_cache.cached_project_ids()
+    existing = set()
+    db = SessionLocal()
+    try:
+        for i in range(0, len(ids), batch_size):
+            existing.update(db.execute(
+                select(Project.id).where(Project.id.in_(ids[i:i + batch_size]))
+            ).scalars())
+    finally:
+        db.close()
+    orphans = [project_id for project_id in ids if project_id not in existing]
+    for project_id in orphans:
+        export_cache.remove_project(project_id)
+    return len(orphans)
+
+def fragment_store(project_id: int, document_type: str) -> Optional[export_cache.FragmentStore]:
+    """The project's store of rendered sections for this renderer and template."""
+    template = templates.EXPORT_DOCX_TEMPLATE if document_type == "docx" else templates.EXPORT_PPTX_TEMPLATE
+    return export_cache.fragment_store(project_id, RENDERER_VERSION, document_type, template)
+
+def render(document_type: str, title: str, topic: str, sections: List[dict], out: BinaryIO,
+           fragments: Optional[export_cache.FragmentStore] = None) -> Tuple[int, int]:
+    """
+    Render plain project data (sections: [{'title', 'blocks'}]) into out.
+    With a fragment store, unchanged sections are reused from the last
+    render and fragments it no longer needs are dropped. Returns the
+    (reused, rendered) section counts; it may run in a render pool worker,
+    so the caller records them.
+    """
+    create = EXPORT_FORMATS[document_type][0]
+    create(title, sections, out, topic=topic, fragments=fragments)
+    if fragments is None:
+        return 0, len(sections)
+    fragments.prune()
+    return fragments.hits, fragments.misses
+
+def _count_sections(document_type: str, counts: Tuple[int, int]):
+    reused, rendered = counts
+    EXPORT_SECTIONS.labels(document_type, "reused").inc(reused)
+    EXPORT_SECTIONS.labels(document_type, "rendered").inc(rendered)
+
+async def render_cached(project, sections: List[dict]) -> Tuple[BinaryIO, str]:
+    """
+    Return an open file holding the project's export, plus its fingerprint.
+    The on-disk cache is served when the fingerprint is unchanged; otherwise
+    the project is rendered (in the render pool when it is enabled) and cached.
+    Renders reuse the project's section fragments, so after an edit only the
+    changed sections are laid out again.
+    """
+    document_type = project.document_type
+    slot = f"export.{document_type}"
+    fp = export_cache.fingerprint(
+        RENDERER_VERSION, document_type, project.title, project.topic,
+        project.updated_at, sections
+    )
+    cached = export_cache.open_cached(project.id, slot, fp)
+    if cached is not None:
+        EXPORT_REQUESTS.labels(document_type, "hit").inc()
+        return cached, fp
+    EXPORT_REQUESTS.labels(document_type, "miss").inc()
+
+    start = time.perf_counter()
+    fragments = fragment_store(project.id, document_type)
+    if render_pool.EXPORT_RENDER_WORKERS > 0:
+        path, counts = await render_pool.render_to_file(
+            document_type, project.title, project.topic, sections, export_cache.staging_dir(project.id),
+            fragments,
+        )
+        _count_sections(document_type, counts)
+        EXPORT_RENDER_SECONDS.labels(document_type).observe(time.perf_counter() - start)
+        EXPORT_SIZE_BYTES.labels(document_type).observe(os.path.getsize(path))
+        if export_cache.EXPORT_CACHE_ENABLED:
+            return open(export_cache.store_file(project.id, slot, fp, path), "rb"), fp
+        # No cache: hand back a spooled copy and drop the worker's file
+        spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES)
+        with open(path, "rb") as rendered:
+            shutil.copyfileobj(rendered, spool)
+        os.remove(path)
+        spool.seek(0)
+        return spool, fp
+
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES)
+    try:
+        counts = await run_in_threadpool(render, document_type, project.title, project.topic, sections, spool, fragments)
+        _count_sections(document_type, counts)
+        EXPORT_RENDER_SECONDS.labels(document_type).observe(time.perf_counter() - start)
+        EXPORT_SIZE_BYTES.labels(document_type).observe(spool.tell())
+        export_cache.store(project.id, slot, fp, spool)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, fp
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import os
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Union
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from ..database import SessionLocal
+from ..models import Project, Section, Refinement
+from .llm_service import generate_content
+from .project_service import add_sections, create_project_with_sections
+from .revision_service import record_revision
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on section generations in flight across the whole process, and
+# per project (shared by every bulk request for the same project).
+GENERATION_CONCURRENCY_GLOBAL = int(os.getenv("GENERATION_CONCURRENCY_GLOBAL", 16))
+GENERATION_CONCURRENCY_PER_PROJECT = int(os.getenv("GENERATION_CONCURRENCY_PER_PROJECT", 4))
+
+_global_limit = asyncio.Semaphore(GENERATION_CONCURRENCY_GLOBAL)
+_project_limits = {}  # project_id -> [semaphore, active bulk requests]
+
+def build_section_prompt(topic: str, title: str) -> Tuple[str, str]:
+    """Return the (prompt, context) pair used to generate a section."""
+    context = f"Document topic: {topic}\nSection: {title}"
+    prompt = f"Write detailed content for the section titled '{title}'"
+    return prompt, context
+
+def apply_section_content(db, section: Section, content: str):
+    """Set newly generated content on a section and record it as a version (caller commits)."""
+    previous = section.content
+    section.content = content
+    record_revision(db, section, previous, content, "generate")
+
+def apply_refinement(db, section: Section, prompt: str, refined_content: str,
+                     feedback: Optional[str] = None, comment: Optional[str] = None) -> Refinement:
+    """
+    Record a refinement and make it the section's current content (caller commits).
+    The text itself goes into the section's revision history as a delta.
+    """
+    refinement = Refinement(
+        section_id=section.id,
+        prompt=prompt,
+        feedback=feedback,
+        comment=comment
+    )
+    db.add(refinement)
+    previous = section.content
+    section.content = refined_content
+    record_revision(db, section, previous, refined_content, "refine", refinement)
+    return refinement
+
+def save_section_content(section_id: int, content: str):
+    """Persist generated content for one section in its own transaction."""
+    db = SessionLocal()
+    try:
+        section = db.get(Section, section_id)
+        if section is not None:
+            apply_section_content(db, section, content)
+            db.commit()
+    finally:
+        db.close()
+
+def save_refinement(section_id: int, prompt: str, refined_content: str,
+                    feedback: Optional[str] = None, comment: Optional[str] = None):
+    """Persist a refinement for one section in its own transaction."""
+    db = SessionLocal()
+    try:
+        section = db.get(Section, section_id)
+        if section is not None:
+            apply_refinement(db, section, prompt, refined_content, feedback, comment)
+            db.commit()
+    finally:
+        db.close()
+
+def save_new_project(user_id: int, title: str, document_type: str, topic: str) -> int:
+    """Insert an empty project in its own transaction and return its id."""
+    db = SessionLocal()
+    try:
+        project, _ = create_project_with_sections(db, user_id, title, document_type, topic, [])
+        db.commit()
+        return project.id
+    finally:
+        db.close()
+
+def delete_project(project_id: int) -> bool:
+    """Delete a project in its own transaction. False if it could not be deleted."""
+    db = SessionLocal()
+    try:
+        project = db.get(Project, project_id)
+        if project is not None:
+            db.delete(project)
+            db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        logger.exception("Deleting project %s failed", project_id)
+        return False
+    finally:
+        db.close()
+
+def save_new_sections(project_id: int, titles: List[str]) -> List[int]:
+    """Bulk-insert sections for titles (in order) in one transaction and return their ids."""
+    db = SessionLocal()
+    try:
+        project = db.get(Project, project_id)
+        rows = add_sections(db, project, [
+            {"title": title, "order_index": index} for index, title in enumerate(titles)
+        ])
+        db.commit()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+def _acquire_project_limit(project_id: int) -> asyncio.Semaphore:
+    entry = _project_limits.get(project_id)
+    if entry is None:
+        entry = _project_limits[project_id] = [asyncio.Semaphore(GENERATION_CONCURRENCY_PER_PROJECT), 0]
+    entry[1] += 1
+    return entry[0]
+
+def _release_project_limit(project_id: int):
+    entry = _project_limits[project_id]
+    entry[1] -= 1
+    if entry[1] == 0:
+        del _project_limits[project_id]
+
+async def _generate_one(topic: str, section_id: Union[int, asyncio.Future], title: str,
+                        limits: List[asyncio.Semaphore], use_cache: bool = True) -> dict:
+    """
+    Generate and save one section. section_id may be a future that resolves
+    once the section row exists, so generation can start before it is inserted.
+    """
+    try:
+        async with AsyncExitStack() as stack:
+            for limit in limits:
+                await stack.enter_async_context(limit)
+            prompt, context = build_section_prompt(topic, title)
+            content = await generate_content(prompt, context, use_cache=use_cache)
+
+        logger.debug("Generated bulk section %s: %d chars", title, len(content or ""))
+
+        # Fallback for empty content (for dev/testing)
+        if not content or not content.strip():
+            content = f"[Sample content for '{title}']"
+
+        if isinstance(section_id, asyncio.Future):
+            section_id = await section_id
+            if section_id is None:
+                raise ValueError("Section was not created")
+        await run_in_threadpool(save_section_content, section_id, content)
+        return {"section_id": section_id, "title": title, "status": "done", "content": content}
+    except Exception as e:
+        if isinstance(section_id, asyncio.Future):
+            section_id = section_id.result() if section_id.done() else None
+        logger.warning("Generating section %s (%s) failed: %s", section_id, title, e)
+        return {"section_id": section_id, "title": title, "status": "error", "error": str(e)}
+
+async def generate_sections(
+    project_id: int,
+    topic: str,
+    sections: List[Tuple[int, str]],
+    concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    on_result: Optional[Callable[[dict], Awaitable[None]]] = None
+) -> List[dict]:
+    """
+    Generate content for (section_id, title) pairs concurrently.
+    Each section is committed as soon as it finishes, then passed to on_result;
+    the returned results keep input order.
+    """
+    project_limit = _acquire_project_limit(project_id)
+    limits = [project_limit, _global_limit]
+    if concurrency is not None and concurrency < GENERATION_CONCURRENCY_PER_PROJECT:
+        limits.insert(0, asyncio.Semaphore(concurrency))
+
+    async def run(section_id: int, title: str) -> dict:
+        result = await _generate_one(topic, section_id, title, limits, use_cache)
+        if on_result is not None:
+            await on_result(result)
+        return result
+
+    try:
+        return await asyncio.gather(*(run(section_id, title) for section_id, title in sections))
+    finally:
+        _release_project_limit(project_id)
+
+async def generate_from_outline(
+    project_id: int,
+    topic: str,
+    headings: AsyncIterator[str],
+    concurrency: Optional[int] = None,
+    use_cache: bool = True
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Pipelined generation: each section starts generating as soon as its heading
+    arrives from the (still streaming) outline. When the outline is complete
+    all sections are inserted in one bulk insert and each pending generation
+    receives its row id through a future before saving.
+
+    Yields (event, data): 'heading' per heading, 'sections' once the rows
+    exist, 'section' per finished section, and 'outline_error' if the outline
+    fails (sections generated so far are then not saved).
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    limits = [_acquire_project_limit(project_id), _global_limit]
+    if concurrency is not None and concurrency < GENERATION_CONCURRENCY_PER_PROJECT:
+        limits.insert(0, asyncio.Semaphore(concurrency))
+    tasks = []
+
+    async def run(index: int, title: str, section_id: asyncio.Future):
+        result = await _generate_one(topic, section_id, title, limits, use_cache)
+        await events.put(("section", {"index": index, **result}))
+
+    async def read_outline():
+        titles, ids = [], []
+        try:
+            async for heading in headings:
+                ids.append(loop.create_future())
+                titles.append(heading)
+                await events.put(("heading", {"index": len(titles) - 1, "title": heading}))
+                tasks.append(asyncio.create_task(run(len(titles) - 1, heading, ids[-1])))
+            section_ids = await run_in_threadpool(save_new_sections, project_id, titles) if titles else []
+            for future, section_id in zip(ids, section_ids):
+                future.set_result(section_id)
+            await events.put(("sections", {"sections": [
+                {"index": index, "section_id": section_id, "title": title}
+                for index, (section_id, title) in enumerate(zip(section_ids, titles))
+            ]}))
+        except Exception as e:
+            for future in ids:
+                if not future.done():
+                    future.set_result(None)
+            await events.put(("outline_error", {"detail": str(e)}))
+        finally:
+            await events.put(("outline_done", {"count": len(titles)}))
+
+    outline = asyncio.create_task(read_outline())
+    try:
+        outline_done, finished = False, 0
+        while not outline_done or finished < len(tasks):
+            event, data = await events.get()
+            if event == "outline_done":
+                outline_done = True
+                continue
+            if event == "section":
+                finished += 1
+            yield event, data
+    finally:
+        # Client went away or we are done: stop anything still running
+        outline.cancel()
+        for task in tasks:
+            task.cancel()
+        _release_project_limit(project_id)
@@ -0,0 +1,151 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_, select, update
+from ..database import SessionLocal
+from ..models import Job
+
+load_dotenv()
+
+# A running job's lease is renewed by its worker; once it lapses (worker
+# crashed or was restarted) another worker may claim the job again.
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 60))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+def enqueue(db, user_id: int, kind: str, project_id: Optional[int] = None, payload: Optional[dict] = None) -> Job:
+    """Queue a job (caller's session is committed)."""
+    job = Job(
+        user_id=user_id,
+        project_id=project_id,
+        kind=kind,
+        status="queued",
+        payload=json.dumps(payload or {}),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def _claimable(now: datetime):
+    return or_(
+        Job.status == "queued",
+        and_(Job.status == "running", Job.locked_until < now),
+    )
+
+def claim(worker_id: str) -> Optional[dict]:
+    """
+    Atomically take the oldest claimable job and return its row as a dict.
+    Postgres skips rows locked by other workers (FOR UPDATE SKIP LOCKED);
+    SQLite ignores the row lock and relies on the conditional UPDATE, which is
+    serialized by its database-level write lock.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        job_id = db.execute(
+            select(Job.id).where(_claimable(now)).order_by(Job.id).limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, _claimable(now))
+            .values(
+                status="running",
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                attempts=Job.attempts + 1,
+                started_at=now,
+                error=None,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return None  # another worker won the race
+        job = db.get(Job, job_id)
+        if job.attempts > JOB_MAX_ATTEMPTS:
+            _finish(db, job, "failed", error="Job abandoned after too many attempts")
+            return None
+        return {
+            "id": job.id,
+            "user_id": job.user_id,
+            "project_id": job.project_id,
+            "kind": job.kind,
+            "payload": json.loads(job.payload or "{}"),
+        }
+    finally:
+        db.close()
+
+def _owned(db, job_id: int, worker_id: str) -> Optional[Job]:
+    job = db.get(Job, job_id)
+    if job is None or job.status != "running" or job.locked_by != worker_id:
+        return None
+    return job
+
+def heartbeat(job_id: int, worker_id: str, progress: Optional[dict] = None) -> bool:
+    """Renew the lease (and optionally record progress). False if the job was lost."""
+    db = SessionLocal()
+    try:
+        job = _owned(db, job_id, worker_id)
+        if job is None:
+            return False
+        job.locked_until = datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+        if progress is not None:
+            job.progress = json.dumps(progress)
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+def _finish(db, job: Job, status: str, result: Optional[dict] = None, error: Optional[str] = None,
+            progress: Optional[dict] = None):
+    job.status = status
+    job.finished_at = datetime.utcnow()
+    job.locked_by = None
+    job.locked_until = None
+    if result is not None:
+        job.result = json.dumps(result)
+    if progress is not None:
+        job.progress = json.dumps(progress)
+    job.error = error
+    db.commit()
+
+def complete(job_id: int, worker_id: str, result: dict, progress: Optional[dict] = None):
+    db = SessionLocal()
+    try:
+        job = _owned(db, job_id, worker_id)
+        if job is not None:
+            _finish(db, job, "succeeded", result=result, progress=progress)
+    finally:
+        db.close()
+
+def fail(job_id: int, worker_id: str, error: str, progress: Optional[dict] = None):
+    db = SessionLocal()
+    try:
+        job = _owned(db, job_id, worker_id)
+        if job is not None:
+            _finish(db, job, "failed", error=error, progress=progress)
+    finally:
+        db.close()
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "project_id": job.project_id,
+        "status": job.status,
+        "progress": json.loads(job.progress) if job.progress else None,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from ..database import SessionLocal
+from ..models import Project, Section
+from . import job_queue, export_engine
+from .generation_service import generate_sections
+from .llm_service import generate_outline
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Jobs a single worker runs at once, and how often an idle worker polls the queue
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", 4))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+
+def _load_project(project_id: int):
+    db = SessionLocal()
+    try:
+        project = db.get(Project, project_id)
+        if project is None:
+            return None, []
+        sections = db.query(Section).filter(
+            Section.project_id == project_id
+        ).order_by(Section.order_index).all()
+        db.expunge_all()
+        return project, sections
+    finally:
+        db.close()
+
+async def _run_generate(job: dict, worker_id: str) -> dict:
+    project, sections = await run_in_threadpool(_load_project, job["project_id"])
+    if project is None:
+        raise ValueError("Project not found")
+    if not sections:
+        raise ValueError("No sections found for this project")
+
+    progress = {
+        "total": len(sections),
+        "done": 0,
+        "failed": 0,
+        "sections": {str(s.id): "queued" for s in sections},
+    }
+
+    async def on_result(result: dict):
+        progress["sections"][str(result["section_id"])] = result["status"]
+        progress["done" if result["status"] == "done" else "failed"] += 1
+        # If the lease was lost the update is dropped and complete() is a no-op
+        await run_in_threadpool(job_queue.heartbeat, job["id"], worker_id, progress)
+
+    payload = job["payload"]
+    results = await generate_sections(
+        project.id, project.topic, [(s.id, s.title) for s in sections],
+        payload.get("concurrency"), use_cache=not payload.get("fresh", False), on_result=on_result
+    )
+    return {
+        "result": "partial" if progress["failed"] else "success",
+        "sections": [{k: v for k, v in r.items() if k != "content"} for r in results],
+    }
+
+async def _run_outline(job: dict, worker_id: str) -> dict:
+    project, _ = await run_in_threadpool(_load_project, job["project_id"])
+    if project is None:
+        raise ValueError("Project not found")
+    # A failed LLM call raises OllamaError, which marks the job failed
+    headings = await generate_outline(
+        project.topic, project.document_type, use_cache=not job["payload"].get("fresh", False)
+    )
+    return {"headings": headings}
+
+async def _run_export(job: dict, worker_id: str) -> dict:
+    project, sections_data = await run_in_threadpool(export_engine.load_export, job["project_id"])
+    if project is None:
+        raise ValueError("Project not found")
+    if project.document_type not in export_engine.EXPORT_FORMATS:
+        raise ValueError("Unsupported document type")
+    f, fp = await export_engine.render_cached(project, sections_data)
+    f.close()
+    return {
+        "fingerprint": fp,
+        "filename": export_engine.export_filename(project.document_type, project.title),
+        "media_type": export_engine.media_type(project.document_type),
+    }
+
+HANDLERS = {
+    "generate": _run_generate,
+    "outline": _run_outline,
+    "export": _run_export,
+}
+
+class JobWorker:
+    """Claims jobs from the jobs table and runs up to `concurrency` of them at once."""
+
+    def __init__(self, concurrency: int = JOB_WORKER_CONCURRENCY, poll_interval: float = JOB_POLL_INTERVAL):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._slots = asyncio.Semaphore(concurrency)
+        self._task = None
+        self._running = set()
+
+    async def _keep_lease(self, job_id: int, work: asyncio.Task):
+        while True:
+            await asyncio.sleep(job_queue.JOB_LEASE_SECONDS / 3)
+            if not await run_in_threadpool(job_queue.heartbeat, job_id, self.worker_id):
+                # Reclaimed by another worker (e.g. after a stall): stop running it here
+                logger.warning("Lost the lease on job %s; cancelling it", job_id)
+                work.cancel()
+                return
+
+    async def _execute(self, job: dict):
+        work = asyncio.create_task(HANDLERS[job["kind"]](job, self.worker_id))
+        lease = asyncio.create_task(self._keep_lease(job["id"], work))
+        try:
+            result = await work
+            await run_in_threadpool(job_queue.complete, job["id"], self.worker_id, result)
+        except asyncio.CancelledError:
+            if not (lease.done() and not lease.cancelled()):
+                raise
+            # Lease lost: the job belongs to its new owner, record nothing
+        except Exception as e:
+            await run_in_threadpool(job_queue.fail, job["id"], self.worker_id, str(e))
+        finally:
+            lease.cancel()
+            work.cancel()
+            self._slots.release()
+
+    async def run(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                job = await run_in_threadpool(job_queue.claim, self.worker_id)
+            except Exception:
+                job = None
+            if job is None:
+                self._slots.release()
+                await asyncio.sleep(self.poll_interval)
+                continue
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop claiming and cancel running jobs; their leases lapse and they are retried."""
+        if self._task is not None:
+            self._task.cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
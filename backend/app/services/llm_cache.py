@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+from dotenv import load_dotenv
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from ..database import SessionLocal, engine
+from ..models import LLMCacheEntry
+
+load_dotenv()
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "true").lower() == "true"
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", 1024))
+LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", 50000))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+# Expired/overflow rows are pruned from the persistent tier every N writes
+LLM_CACHE_PRUNE_EVERY = int(os.getenv("LLM_CACHE_PRUNE_EVERY", 100))
+
+# Dialects with INSERT ... ON CONFLICT, used to upsert cache rows
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def make_key(model: str, prompt: str, options: Optional[dict] = None) -> str:
+    """Content-addressed cache key over everything that shapes the response."""
+    material = json.dumps({"model": model, "prompt": prompt, "options": options or {}}, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """
+    Two-tier response cache: an in-process LRU in front of the llm_cache table.
+    Both tiers expire entries after ttl seconds; the table is trimmed to max_rows
+    by least recent hit.
+    """
+
+    def __init__(self, memory_entries: int, max_rows: int, ttl: int, persist: bool = True):
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.persist = persist
+        self._memory = OrderedDict()  # key -> (response, stored_at)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = {
+            "memory_hits": 0, "db_hits": 0, "misses": 0,
+            "writes": 0, "evictions": 0, "bypassed": 0,
+        }
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _remember(self, key: str, response: str, stored_at: float):
+        with self._lock:
+            self._memory[key] = (response, stored_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a response, promoting persistent hits into memory. Blocking."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[1] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+                self.counters["evictions"] += 1
+
+        if self.persist:
+            db = SessionLocal()
+            try:
+                row = db.get(LLMCacheEntry, key)
+                if row is not None:
+                    if row.created_at >= datetime.utcnow() - timedelta(seconds=self.ttl):
+                        row.last_hit_at = datetime.utcnow()
+                        db.commit()
+                        stored_at = now - (datetime.utcnow() - row.created_at).total_seconds()
+                        self._remember(key, row.response, stored_at)
+                        self._count("db_hits")
+                        return row.response
+                    db.delete(row)
+                    db.commit()
+                    self._count("evictions")
+            finally:
+                db.close()
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, model: str, response: str):
+        """Store a response in both tiers. Blocking."""
+        self._remember(key, response, time.time())
+        self._count("writes")
+        if not self.persist:
+            return
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            # One upsert, so concurrent misses on the same prompt don't race on the key
+            insert = _UPSERT_INSERTS[engine.dialect.name](LLMCacheEntry).values(
+                key=key, model=model, response=response, created_at=now, last_hit_at=now
+            )
+            db.execute(insert.on_conflict_do_update(
+                index_elements=[LLMCacheEntry.key],
+                set_={"model": model, "response": response, "created_at": now, "last_hit_at": now},
+            ))
+            db.commit()
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % LLM_CACHE_PRUNE_EVERY == 0
+            if prune:
+                self.prune(db)
+        finally:
+            db.close()
+
+    def prune(self, db):
+        """Drop expired rows and trim the table to max_rows."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        removed = db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.created_at < cutoff)).rowcount
+        overflow_cutoff = db.execute(
+            select(LLMCacheEntry.last_hit_at)
+            .order_by(LLMCacheEntry.last_hit_at.desc())
+            .offset(self.max_rows).limit(1)
+        ).scalar()
+        if overflow_cutoff is not None:
+            removed += db.execute(
+                delete(LLMCacheEntry).where(LLMCacheEntry.last_hit_at <= overflow_cutoff)
+            ).rowcount
+        db.commit()
+        self._count("evictions", removed)
+
+    def record_bypass(self):
+        self._count("bypassed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["db_hits"]) / lookups if lookups else 0.0
+        return stats
+
+llm_cache = LLMResponseCache(
+    LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_MAX_ROWS, LLM_CACHE_TTL_SECONDS, persist=LLM_CACHE_PERSIST
+)
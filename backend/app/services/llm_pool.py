@@ -0,0 +1,224 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Iterable, List, Optional
+from dotenv import load_dotenv
+from ..metrics import LLM_REQUEST_SECONDS
+
+load_dotenv()
+
+# Consecutive failed requests (5xx, connect errors, broken streams) before a host is ejected
+LLM_EJECT_AFTER = int(os.getenv("LLM_EJECT_AFTER", 3))
+# First ejection length; repeated ejections double it up to 8x
+LLM_EJECT_SECONDS = float(os.getenv("LLM_EJECT_SECONDS", 30))
+# A recovered host's share of traffic ramps up over this window (0 = full share at once)
+LLM_SLOW_START_SECONDS = float(os.getenv("LLM_SLOW_START_SECONDS", 30))
+# Active checks (GET /api/tags) every N seconds; 0 leaves only passive checks
+LLM_HEALTH_INTERVAL = float(os.getenv("LLM_HEALTH_INTERVAL", 10))
+LLM_HEALTH_TIMEOUT = float(os.getenv("LLM_HEALTH_TIMEOUT", 2))
+# Failed active checks in a row before a host is marked unhealthy
+LLM_HEALTH_FAILURES = int(os.getenv("LLM_HEALTH_FAILURES", 2))
+# Recent request latencies kept per host for the percentiles in stats
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", 512))
+
+# Lowest traffic weight of a host at the start of slow start
+_MIN_WEIGHT = 0.1
+_MAX_EJECT_MULTIPLIER = 8
+
+class LLMUnavailable(Exception):
+    """Raised when no configured backend serves the requested model."""
+
+def parse_backends(spec: str, default_url: str) -> List["Backend"]:
+    """
+    Parse LLM_BACKENDS: comma-separated base URLs, each optionally followed by
+    '=' and the '|'-separated models it serves, e.g.
+    "http://gpu1:11434=gemma:2b|llama3:8b,http://gpu2:11434".
+    A host without a model list takes any model. Empty spec -> default_url.
+    """
+    backends = []
+    for item in spec.split(","):
+        url, _, models = item.strip().partition("=")
+        if url:
+            backends.append(Backend(url, [m.strip() for m in models.split("|") if m.strip()]))
+    return backends or [Backend(default_url)]
+
+class Backend:
+    """One LLM host and its load, health and latency state."""
+
+    def __init__(self, url: str, models: Optional[List[str]] = None):
+        self.url = url.rstrip("/")
+        self.models = set(models or ())
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.eject_streak = 0  # ejections since the last success; drives the backoff
+        self.ejected_until = 0.0
+        self.healthy = True  # last active check verdict
+        self.check_failures = 0
+        self.recovered_at = 0.0  # slow start runs from here
+        self.latencies = deque(maxlen=LLM_LATENCY_WINDOW)
+
+    def serves(self, model: str) -> bool:
+        return not self.models or model in self.models
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def weight(self, now: float) -> float:
+        if LLM_SLOW_START_SECONDS <= 0 or now >= self.recovered_at + LLM_SLOW_START_SECONDS:
+            return 1.0
+        ramp = max(now - self.recovered_at, 0) / LLM_SLOW_START_SECONDS
+        return _MIN_WEIGHT + (1 - _MIN_WEIGHT) * ramp
+
+    def load(self, now: float) -> float:
+        return (self.outstanding + 1) / self.weight(now)
+
+    def record(self, ok: bool, seconds: float):
+        self.requests += 1
+        if ok:
+            self.consecutive_failures = 0
+            self.eject_streak = 0
+            self.latencies.append(seconds)
+            return
+        self.errors += 1
+        now = time.monotonic()
+        if now < self.ejected_until:
+            return  # stragglers sent before the ejection
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= LLM_EJECT_AFTER:
+            self.consecutive_failures = 0
+            self.ejections += 1
+            self.eject_streak += 1
+            multiplier = min(2 ** (self.eject_streak - 1), _MAX_EJECT_MULTIPLIER)
+            self.ejected_until = now + LLM_EJECT_SECONDS * multiplier
+            self.recovered_at = self.ejected_until
+
+    def record_check(self, ok: bool):
+        if ok:
+            if not self.healthy:
+                self.healthy = True
+                self.recovered_at = time.monotonic()
+            self.check_failures = 0
+            return
+        self.check_failures += 1
+        if self.check_failures >= LLM_HEALTH_FAILURES:
+            self.healthy = False
+
+    def state(self, now: float) -> str:
+        if not self.healthy:
+            return "unhealthy"
+        if now < self.ejected_until:
+            return "ejected"
+        if self.weight(now) < 1.0:
+            return "slow_start"
+        return "healthy"
+
+    def stats(self, now: float) -> dict:
+        latencies = sorted(self.latencies)
+
+        def pct(p):
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 4) if latencies else None
+
+        return {
+            "url": self.url,
+            "models": sorted(self.models) or None,
+            "state": self.state(now),
+            "weight": round(self.weight(now), 2),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "latency_p50": pct(0.5),
+            "latency_p95": pct(0.95),
+        }
+
+class Attempt:
+    """One request routed to a backend. Set status to the HTTP status once known."""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self.url = backend.url
+        self.status: Optional[int] = None
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+class LLMBackendPool:
+    """
+    Routes each LLM request to the available host serving the model with the
+    fewest outstanding requests, weighted down while a recovered host is in
+    slow start. Hosts are ejected after repeated failures (passive checks) or
+    failed GET /api/tags probes (active checks). If every candidate is down,
+    requests are spread over all of them rather than failing outright.
+    """
+
+    def __init__(self, backends: List[Backend]):
+        self.backends = backends
+        self.panics = 0
+
+    def candidates(self, model: str, exclude: Iterable[Backend] = ()) -> List[Backend]:
+        return [b for b in self.backends if b.serves(model) and b not in exclude]
+
+    def select(self, model: str, exclude: Iterable[Backend] = ()) -> Backend:
+        candidates = self.candidates(model, exclude)
+        if not candidates:
+            raise LLMUnavailable(f"No LLM backend available for model {model}")
+        now = time.monotonic()
+        available = [b for b in candidates if b.available(now)]
+        if not available:
+            self.panics += 1
+            available = candidates
+        best = min(b.load(now) for b in available)
+        return random.choice([b for b in available if b.load(now) == best])
+
+    @asynccontextmanager
+    async def use(self, model: str, exclude: Iterable[Backend] = ()):
+        """
+        Pick a backend and track the request on it. Exceptions count as a
+        failure unless the response was already judged a client error (4xx);
+        cancellation (client disconnect) counts as neither.
+        """
+        attempt = Attempt(self.select(model, exclude))
+        backend = attempt.backend
+        backend.outstanding += 1
+        start = time.perf_counter()
+        outcome = None
+        try:
+            yield attempt
+            outcome = not attempt.failed and (attempt.status is None or attempt.status < 500)
+        except Exception:
+            outcome = attempt.status is not None and 400 <= attempt.status < 500
+            raise
+        finally:
+            backend.outstanding -= 1
+            seconds = time.perf_counter() - start
+            if outcome is not None:
+                backend.record(outcome, seconds)
+            label = "cancelled" if outcome is None else ("ok" if outcome else "error")
+            LLM_REQUEST_SECONDS.labels(model, backend.url, label).observe(seconds)
+
+    async def check(self, client):
+        """Probe every backend once, concurrently."""
+        async def probe(backend: Backend):
+            try:
+                response = await client.get(f"{backend.url}/api/tags", timeout=LLM_HEALTH_TIMEOUT)
+                backend.record_check(response.status_code == 200)
+            except Exception:
+                backend.record_check(False)
+
+        await asyncio.gather(*(probe(b) for b in self.backends))
+
+    async def run_health_checks(self, get_client: Callable):
+        while True:
+            await self.check(get_client())
+            await asyncio.sleep(LLM_HEALTH_INTERVAL)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {"panics": self.panics, "backends": [b.stats(now) for b in self.backends]}
@@ -1,52 +1,226 @@
-import requests
+import asyncio
+import httpx
+import json
+import logging
 import os
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from ..metrics import observe_llm_usage
+from .llm_cache import llm_cache, make_key, LLM_CACHE_ENABLED
+from .llm_pool import LLM_HEALTH_INTERVAL, LLMBackendPool, LLMUnavailable, parse_backends
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Optional: Allow configuration from .env
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost")
 OLLAMA_PORT = os.getenv("OLLAMA_PORT", "11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma:2b")
 
-OLLAMA_URL = f"{OLLAMA_HOST}:{OLLAMA_PORT}/api/generate"
+# Several Ollama hosts, optionally with the models each serves:
+# "http://gpu1:11434=gemma:2b|llama3:8b,http://gpu2:11434". Unset -> OLLAMA_HOST:OLLAMA_PORT.
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "")
+# Extra hosts tried when a request cannot connect to the one it was routed to
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", 1))
+
+backend_pool = LLMBackendPool(parse_backends(LLM_BACKENDS, f"{OLLAMA_HOST}:{OLLAMA_PORT}"))
+
+# Connection pool for the shared client. Generations are long-running, so the
+# read timeout is generous while connects fail fast.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 200))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", 50))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", 60))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 300))
+
+_client: Optional[httpx.AsyncClient] = None
+_health_task: Optional[asyncio.Task] = None
+
+class OllamaError(Exception):
+    """Raised when an LLM request fails: an error response, an error chunk or a transport failure."""
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        )
+    return _client
+
+def start():
+    """Start active health checks of the LLM backends (called on application startup)."""
+    global _health_task
+    if LLM_HEALTH_INTERVAL > 0 and _health_task is None:
+        _health_task = asyncio.create_task(backend_pool.run_health_checks(get_client))
+
+async def close_client():
+    """Stop health checks and close the shared client (called on application shutdown)."""
+    global _client, _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        _health_task = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def _cache_lookup(key: str, use_cache: bool) -> Optional[str]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    if not use_cache:
+        llm_cache.record_bypass()
+        return None
+    return await run_in_threadpool(llm_cache.get, key)
 
-def generate_content(prompt: str, context: str = "") -> str:
-    """Generate content using Ollama gemma-2b locally."""
+async def _cache_store(key: str, text: str):
+    """Cache a finished generation; a failed write is logged, never raised."""
+    if LLM_CACHE_ENABLED and text:
+        try:
+            await run_in_threadpool(llm_cache.set, key, OLLAMA_MODEL, text)
+        except Exception:
+            logger.exception("Storing LLM response in the cache failed")
+
+async def _post_generate(payload: dict) -> httpx.Response:
+    """
+    POST a non-streaming generation to the least-loaded backend, moving on to
+    another host if the connection fails before the request is sent.
+    """
+    tried = []
+    while True:
+        async with backend_pool.use(payload["model"], exclude=tried) as attempt:
+            tried.append(attempt.backend)
+            try:
+                response = await get_client().post(f"{attempt.url}/api/generate", json=payload)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                attempt.fail()
+                if len(tried) > LLM_RETRIES or not backend_pool.candidates(payload["model"], tried):
+                    raise
+                continue
+            attempt.status = response.status_code
+            return response
+
+async def generate_content(prompt: str, context: str = "", options: Optional[dict] = None,
+                           use_cache: bool = True) -> str:
+    """
+    Generate content using Ollama gemma-2b locally.
+    Responses are cached by model, prompt and options; use_cache=False forces a
+    fresh generation (which then replaces the cached response).
+    Raises OllamaError if the generation fails, so error text is never
+    returned as content.
+    """
     try:
         full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        cache_key = make_key(OLLAMA_MODEL, full_prompt, options)
+        cached = await _cache_lookup(cache_key, use_cache)
+        if cached is not None:
+            return cached
         payload = {
             "model": OLLAMA_MODEL,
             "prompt": full_prompt,
             "stream": False
         }
-        response = requests.post(OLLAMA_URL, json=payload)
+        if options:
+            payload["options"] = options
+        response = await _post_generate(payload)
         if response.status_code == 200:
-            return response.json().get("response", "").strip()
+            data = response.json()
+            observe_llm_usage(OLLAMA_MODEL, data)
+            text = data.get("response", "").strip()
+            await _cache_store(cache_key, text)
+            return text
         else:
-            return f"Error from Ollama: {response.status_code}\n{response.text}"
+            raise OllamaError(f"Error from Ollama: {response.status_code}\n{response.text}")
+    except OllamaError:
+        raise
     except Exception as e:
-        return f"Error generating content: {str(e)}"
+        raise OllamaError(f"Error generating content: {str(e)}") from e
 
-def generate_outline(topic: str, document_type: str) -> list:
-    """Generate document outline/slide titles"""
+async def stream_content(prompt: str, context: str = "", options: Optional[dict] = None,
+                         use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Stream generated tokens from Ollama as they arrive.
+    Closing the iterator (e.g. on client disconnect) closes the upstream request.
+    A cached response is yielded as a single chunk; completed streams are cached.
+    Failures raise OllamaError, as in generate_content.
+    """
+    full_prompt = f"{context}\n\n{prompt}" if context else prompt
+    cache_key = make_key(OLLAMA_MODEL, full_prompt, options)
+    cached = await _cache_lookup(cache_key, use_cache)
+    if cached is not None:
+        yield cached
+        return
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": full_prompt,
+        "stream": True
+    }
+    if options:
+        payload["options"] = options
+    parts = []
+    try:
+        async with backend_pool.use(OLLAMA_MODEL) as attempt:
+            async with get_client().stream("POST", f"{attempt.url}/api/generate", json=payload) as response:
+                attempt.status = response.status_code
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise OllamaError(f"Error from Ollama: {response.status_code}\n{body.decode(errors='replace')}")
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise OllamaError(chunk["error"])
+                    if chunk.get("response"):
+                        parts.append(chunk["response"])
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        observe_llm_usage(OLLAMA_MODEL, chunk)
+                        break
+    except (httpx.HTTPError, LLMUnavailable, ValueError) as e:
+        raise OllamaError(f"Error generating content: {str(e)}") from e
+    await _cache_store(cache_key, "".join(parts).strip())
+
+def build_outline_prompt(topic: str, document_type: str) -> str:
     if document_type == "docx":
-        prompt = (
+        return (
             f"Generate 5-7 section headings for a professional document about: {topic}. "
             f"Return only the headings, one per line."
         )
-    else:  # pptx
-        prompt = (
-            f"Generate 8-10 slide titles for a professional presentation about: {topic}. "
-            f"Return only the titles, one per line."
-        )
-    response = generate_content(prompt)
+    # pptx
+    return (
+        f"Generate 8-10 slide titles for a professional presentation about: {topic}. "
+        f"Return only the titles, one per line."
+    )
+
+async def generate_outline(topic: str, document_type: str, use_cache: bool = True) -> list:
+    """Generate document outline/slide titles"""
+    response = await generate_content(build_outline_prompt(topic, document_type), use_cache=use_cache)
     headings = [line.strip() for line in response.split('\n') if line.strip()]
     return headings
 
-def refine_section(original_content: str, refinement_prompt: str) -> str:
-    """Refine existing content based on user prompt"""
-    prompt = (
+async def stream_outline(topic: str, document_type: str, use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Yield outline headings one at a time as soon as each line is complete.
+    Shares its cache entry with generate_outline.
+    """
+    buffer = ""
+    async for token in stream_content(build_outline_prompt(topic, document_type), use_cache=use_cache):
+        buffer += token
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield line.strip()
+    if buffer.strip():
+        yield buffer.strip()
+
+def build_refine_prompt(original_content: str, refinement_prompt: str) -> str:
+    return (
         f"Original content:\n{original_content}\n\nUser request: {refinement_prompt}\n\nPlease provide the refined version:"
     )
-    return generate_content(prompt)
@@ -0,0 +1,108 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from ..utils.security import get_password_hash, verify_and_update_password
+
+load_dotenv()
+
+# Worker processes for bcrypt; 0 hashes on the API's thread pool instead
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(os.cpu_count() or 1, 2)))
+# Hash/verify calls admitted at once (running + queued); beyond this requests get a 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+# Seconds clients are told to wait before retrying a rejected login/register
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", 1))
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "pending": 0,  # admitted (running or queued in the pool)
+    "completed": 0,
+    "rejected": 0,
+    "rehashed": 0,
+    "hash_seconds_total": 0.0,
+    "wait_seconds_total": 0.0,
+}
+
+def _timed(fn, *args):
+    """Runs in a worker process: call fn and report its CPU-bound duration."""
+    start = time.perf_counter()
+    return fn(*args), time.perf_counter() - start
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+def start():
+    """Start the worker processes ahead of the first login."""
+    if PASSWORD_HASH_WORKERS > 0:
+        executor = get_executor()
+        for _ in range(PASSWORD_HASH_WORKERS):
+            executor.submit(time.sleep, 0)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def _run(fn, *args):
+    with _stats_lock:
+        if _stats["pending"] >= PASSWORD_HASH_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise PasswordPoolBusy()
+        _stats["pending"] += 1
+    start = time.perf_counter()
+    try:
+        if PASSWORD_HASH_WORKERS > 0:
+            result, hash_seconds = await asyncio.get_running_loop().run_in_executor(
+                get_executor(), _timed, fn, *args
+            )
+        else:
+            result, hash_seconds = await run_in_threadpool(_timed, fn, *args)
+    finally:
+        with _stats_lock:
+            _stats["pending"] -= 1
+    with _stats_lock:
+        _stats["completed"] += 1
+        _stats["hash_seconds_total"] += hash_seconds
+        _stats["wait_seconds_total"] += max(time.perf_counter() - start - hash_seconds, 0.0)
+    return result
+
+async def hash_password(password: str) -> str:
+    return await _run(get_password_hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify off the event loop; the second item is a replacement hash if the work factor changed."""
+    verified, new_hash = await _run(verify_and_update_password, plain_password, hashed_password)
+    if new_hash is not None:
+        with _stats_lock:
+            _stats["rehashed"] += 1
+    return verified, new_hash
+
+def stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["workers"] = PASSWORD_HASH_WORKERS
+    stats["max_pending"] = PASSWORD_HASH_MAX_PENDING
+    stats["queue_depth"] = max(stats["pending"] - max(PASSWORD_HASH_WORKERS, 1), 0)
+    completed = stats["completed"]
+    stats["hash_seconds_avg"] = stats["hash_seconds_total"] / completed if completed else 0.0
+    stats["wait_seconds_avg"] = stats["wait_seconds_total"] / completed if completed else 0.0
+    return stats
@@ -1,33 +1,151 @@
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from typing import List
-import io
+from copy import deepcopy
+from typing import BinaryIO, List, Optional
+from lxml import etree
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.parts.slide import SlidePart
+from .export_cache import FragmentStore
+from .templates import new_presentation, slide_layout, TITLE_LAYOUT, CONTENT_LAYOUT
+from ..utils.markdown import plain_text, run_style
 
-def create_pptx(title: str, slides: List[dict]) -> bytes:
+# Max lines (bullets) per slide
+MAX_LINES_PER_SLIDE = 5
+
+# Stored section fragments are the section's <p:sld> elements; parsed inside a wrapper
+_FRAGMENT_OPEN = f"<p:sldLst {nsdecls('p')}>".encode()
+_FRAGMENT_CLOSE = b"</p:sldLst>"
+
+def _starts_slide(runs: list, text: str) -> bool:
+    """Bold-only lines and questions become slide titles."""
+    return text.strip().endswith("?") or (bool(runs) and all("b" in run_style(run) for run in runs))
+
+def split_into_slides(title: str, blocks: list) -> list:
+    """
+    Split a section's blocks into (heading, bullet lines) slides. Headings,
+    bold-only lines and questions start a new slide; long bodies continue on
+    extra slides. Bullet lines keep their runs (with inline bold/italic).
+    """
+    slides = []
+    current_title = title
+    current_body = []
+    for block in blocks or []:
+        kind = block[0]
+        if kind == "h":
+            lines = [(block[2], True)]
+        elif kind == "p":
+            lines = [(runs, _starts_slide(runs, plain_text(runs))) for runs in block[1]]
+        elif kind == "ol":
+            lines = [([f"{n}. "] + runs, False) for n, runs in enumerate(block[1], 1)]
+        else:
+            lines = [(runs, False) for runs in block[1]]
+        for runs, is_title in lines:
+            if is_title:
+                if current_body:
+                    slides.append((current_title, current_body))
+                    current_body = []
+                current_title = plain_text(runs).strip()
+            else:
+                current_body.append(runs)
+    if current_body:
+        slides.append((current_title, current_body))
+
+    chunked = []
+    for heading, body_lines in slides:
+        for idx in range(0, len(body_lines), MAX_LINES_PER_SLIDE):
+            chunk = body_lines[idx:idx + MAX_LINES_PER_SLIDE]
+            chunked.append((heading if idx == 0 else f"{heading} (cont'd)", chunk))
+    return chunked
+
+def _run_prototypes() -> dict:
+    """<a:r> templates per inline style ("", "b", "i", "bi"), each with an empty <a:t>."""
+    prototypes = {}
+    for style in ("", "b", "i", "bi"):
+        flags = "".join(f' {flag}="1"' for flag in "bi" if flag in style)
+        prototypes[style] = parse_xml(f"<a:r {nsdecls('a')}><a:rPr{flags}/><a:t/></a:r>")
+    return prototypes
+
+_RUNS = _run_prototypes()
+
+def _set_runs(paragraph, runs: list):
     """
-    Create a PowerPoint presentation
-    slides: [{'title': 'Slide 1', 'content': 'Content here'}, ...]
+    Append runs by copying a prebuilt <a:r> per style; add_run plus the font
+    setters re-resolve each child's schema position on every run.
     """
-    prs = Presentation()
-    prs.slide_width = Inches(10)
-    prs.slide_height = Inches(7.5)
-    
+    p = paragraph._p
+    end = p.find(qn("a:endParaRPr"))
+    for run in runs:
+        text, style = (run, "") if isinstance(run, str) else run
+        element = deepcopy(_RUNS[style])
+        element[-1].text = text
+        if end is None:
+            p.append(element)
+        else:
+            end.addprevious(element)
+
+def _add_slide(prs, layout, element=None):
+    """
+    Add a slide on layout: a blank one with the layout's placeholders, or a
+    stored <p:sld> element. Like Slides.add_slide, but the presentation's
+    relationship is added without first searching all existing ones for a
+    match, which makes building a long deck quadratic.
+    """
+    presentation_part = prs.part
+    partname = presentation_part._next_slide_partname
+    if element is None:
+        slide_part = SlidePart.new(partname, presentation_part.package, layout.part)
+    else:
+        slide_part = SlidePart(partname, CT.PML_SLIDE, presentation_part.package, element)
+        slide_part.relate_to(layout.part, RT.SLIDE_LAYOUT)
+    rId = presentation_part._rels._add_relationship(RT.SLIDE, slide_part)
+    prs.slides._sldIdLst.add_sldId(rId)
+    if element is None:
+        slide_part.slide.shapes.clone_layout_placeholders(layout)
+    return slide_part.slide
+
+def _add_section_slides(prs, layout, section: dict) -> list:
+    slides = []
+    for heading, bullets in split_into_slides(section['title'], section['blocks']):
+        slide = _add_slide(prs, layout)
+        slide.shapes.title.text = heading
+        text_frame = slide.placeholders[1].text_frame
+        text_frame.word_wrap = True
+        # Each line is a bullet
+        _set_runs(text_frame.paragraphs[0], bullets[0])
+        for bullet in bullets[1:]:
+            _set_runs(text_frame.add_paragraph(), bullet)
+        slides.append(slide)
+    return slides
+
+def create_pptx(title: str, slides: List[dict], out: BinaryIO, topic: Optional[str] = None,
+                fragments: Optional[FragmentStore] = None):
+    """
+    Create a PowerPoint presentation and write it to out
+    slides: [{'title': 'Slide 1', 'blocks': [...]}, ...] (utils.markdown block model)
+    Bullet font and size come from the template's slide master.
+    With fragments, sections rendered by an earlier export are added from
+    their stored slide XML and only new or changed sections are rendered.
+    """
+    prs = new_presentation()
+
     # Title slide
-    title_slide_layout = prs.slide_layouts[0]
-    slide = prs.slides.add_slide(title_slide_layout)
+    slide = prs.slides.add_slide(slide_layout(prs, TITLE_LAYOUT, 0))
     slide.shapes.title.text = title
-    
+    if topic and len(slide.placeholders) > 1:
+        slide.placeholders[1].text = topic
+
     # Content slides
-    bullet_slide_layout = prs.slide_layouts[1]
+    bullet_slide_layout = slide_layout(prs, CONTENT_LAYOUT, 1)
     for slide_data in slides:
-        slide = prs.slides.add_slide(bullet_slide_layout)
-        slide.shapes.title.text = slide_data['title']
-        
-        content = slide.shapes.placeholders[1].text_frame
-        content.text = slide_data['content']
-    
-    # Save to bytes
-    file_stream = io.BytesIO()
-    prs.save(file_stream)
-    file_stream.seek(0)
-    return file_stream.read()
+        fragment = fragments.get(slide_data) if fragments is not None else None
+        if fragment is not None:
+            wrapper = parse_xml(_FRAGMENT_OPEN + fragment + _FRAGMENT_CLOSE)
+            for element in list(wrapper):
+                wrapper.remove(element)  # each slide is the root of its own part
+                _add_slide(prs, bullet_slide_layout, element)
+            continue
+        added = _add_section_slides(prs, bullet_slide_layout, slide_data)
+        if fragments is not None:
+            fragments.put(slide_data, b"".join(etree.tostring(s.element) for s in added))
+
+    prs.save(out)
@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import insert, literal, select
+from ..models import Project, Section
+from ..utils.markdown import parse_blocks
+
+def create_project_with_sections(db, user_id: int, title: str, document_type: str, topic: str,
+                                 sections: List[dict]) -> Tuple[Project, list]:
+    """
+    Insert a project and its sections ({'title', 'order_index', 'content'?})
+    with one INSERT for the project and a batched executemany for the sections,
+    both using RETURNING instead of re-querying (caller commits).
+    Returns the project and its (id, title, order_index) rows in order.
+    """
+    project = Project(user_id=user_id, title=title, document_type=document_type, topic=topic)
+    db.add(project)
+    db.flush()
+    return project, add_sections(db, project, sections)
+
+def add_sections(db, project: Project, sections: List[dict]) -> list:
+    """
+    Bulk-insert sections into an existing project with one executemany
+    INSERT ... RETURNING (caller commits). Returns (id, title, order_index) rows in order.
+    Core inserts skip the ORM hook that parses content, so blocks are parsed here.
+    """
+    if not sections:
+        return []
+    # Core inserts skip the ORM flush hook that bumps updated_at, so do it here
+    project.updated_at = datetime.utcnow()
+    rows = db.execute(
+        insert(Section).returning(
+            Section.id, Section.title, Section.order_index, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "project_id": project.id,
+                "title": section["title"],
+                "order_index": section["order_index"],
+                "content": section.get("content"),
+                "content_blocks": parse_blocks(section["content"]) if section.get("content") is not None else None,
+            }
+            for section in sections
+        ],
+    ).all()
+    return sorted(rows, key=lambda row: row.order_index)
+
+def clone_project(db, source: Project, user_id: int, title: Optional[str] = None) -> Tuple[Project, list]:
+    """
+    Copy a project and all its sections server-side with INSERT ... SELECT, so
+    section bodies never leave the database (caller commits). Revision history
+    is not copied; the clone's history starts from the copied content.
+    """
+    project = Project(
+        user_id=user_id,
+        title=title if title is not None else source.title,
+        document_type=source.document_type,
+        topic=source.topic,
+    )
+    db.add(project)
+    db.flush()
+    rows = db.execute(
+        insert(Section)
+        .from_select(
+            ["project_id", "title", "content", "content_blocks", "order_index"],
+            select(literal(project.id), Section.title, Section.content, Section.content_blocks, Section.order_index)
+            .where(Section.project_id == source.id)
+            .order_by(Section.order_index),
+        )
+        .returning(Section.id, Section.title, Section.order_index)
+    ).all()
+    # Core inserts skip the ORM flush hook that bumps updated_at, so do it here
+    project.updated_at = datetime.utcnow()
+    return project, sorted(rows, key=lambda row: row.order_index)
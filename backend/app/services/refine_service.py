@@ -0,0 +1,178 @@
+import asyncio
+import os
+import re
+from typing import AsyncIterator, List
+from dotenv import load_dotenv
+from ..utils.chunking import chunk_paragraphs, estimate_tokens, split_paragraphs
+from .llm_service import OLLAMA_MODEL, OllamaError, build_refine_prompt, generate_content, stream_content
+
+load_dotenv()
+
+# Context window (tokens) per model, e.g. "gemma:2b=2048,llama3:8b=8192";
+# models not listed use LLM_TOKEN_BUDGET. Match the server's num_ctx.
+LLM_TOKEN_BUDGET = int(os.getenv("LLM_TOKEN_BUDGET", 2048))
+LLM_TOKEN_BUDGETS = {
+    model.strip(): int(tokens)
+    for model, _, tokens in (
+        item.rpartition("=") for item in os.getenv("LLM_TOKEN_BUDGETS", "").split(",") if "=" in item
+    )
+}
+# Chunks of one refinement sent to the model at once
+REFINE_CHUNK_CONCURRENCY = int(os.getenv("REFINE_CHUNK_CONCURRENCY", 4))
+# Ask the model to rewrite the paragraphs around each seam so chunks flow together
+# (one extra call per seam; set false to only drop paragraphs repeated across seams)
+REFINE_SMOOTH_SEAMS = os.getenv("REFINE_SMOOTH_SEAMS", "true").lower() == "true"
+
+# Tokens kept free for the prompt scaffolding around the content
+_PROMPT_OVERHEAD_TOKENS = 96
+# How much of the preceding part is shown to a chunk for continuity
+_CONTEXT_TAIL_CHARS = 400
+_PREAMBLE = re.compile(r"^(here('s| is)|sure|certainly|refined version)[^\n]*:\s*$", re.IGNORECASE)
+
+def token_budget(model: str = OLLAMA_MODEL) -> int:
+    return LLM_TOKEN_BUDGETS.get(model, LLM_TOKEN_BUDGET)
+
+def chunk_budget(instruction: str, model: str = OLLAMA_MODEL) -> int:
+    """
+    Content tokens one refine call can take: the rest of the window after the
+    prompt, split evenly between input and output (output ~ input length).
+    """
+    free = token_budget(model) - estimate_tokens(instruction) - _PROMPT_OVERHEAD_TOKENS
+    return max(free // 2, 64)
+
+def needs_chunking(original_content: str, instruction: str) -> bool:
+    return estimate_tokens(original_content) > chunk_budget(instruction)
+
+def build_chunk_prompt(chunk: str, instruction: str, index: int, total: int, previous_tail: str = "") -> str:
+    header = (
+        f"You are refining part {index + 1} of {total} of a longer section. "
+        f"Refine only this part and keep its structure; do not add a title, introduction or conclusion.\n"
+    )
+    if previous_tail:
+        header += f"For continuity, the previous part ends with:\n...{previous_tail}\n\n"
+    return header + build_refine_prompt(chunk, instruction)
+
+def _clean_chunk_output(text: str) -> str:
+    """Drop chatty preambles ('Here is the refined version:') the model adds per chunk."""
+    lines = text.strip().split("\n")
+    while lines and (_PREAMBLE.match(lines[0].strip()) or not lines[0].strip()):
+        lines.pop(0)
+    return "\n".join(lines).strip()
+
+def _normalize(paragraph: str) -> str:
+    return re.sub(r"\W+", " ", paragraph).strip().lower()
+
+def _drop_repeated(previous: List[str], following: List[str]) -> List[str]:
+    """Drop a paragraph the model repeated across a seam."""
+    if previous and following and _normalize(following[0]) == _normalize(previous[-1]):
+        return following[1:]
+    return following
+
+async def _smooth_seam(left: str, right: str, instruction: str, use_cache: bool) -> tuple:
+    prompt = (
+        f"The two paragraphs below are adjacent in a document but were edited separately. "
+        f"Rewrite them so the transition reads naturally, following this request: {instruction}\n"
+        f"Keep their meaning and return exactly two paragraphs separated by a blank line.\n\n"
+        f"{left}\n\n{right}"
+    )
+    try:
+        result = await generate_content(prompt, use_cache=use_cache)
+    except OllamaError:
+        return left, right
+    parts = split_paragraphs(_clean_chunk_output(result))
+    if len(parts) != 2:
+        return left, right
+    return parts[0], parts[1]
+
+async def _refine_chunk(chunks: List[str], index: int, instruction: str,
+                        limit: asyncio.Semaphore, use_cache: bool) -> List[str]:
+    """Refine one chunk and return its paragraphs; a failed LLM call raises OllamaError."""
+    tail = chunks[index - 1][-_CONTEXT_TAIL_CHARS:] if index else ""
+    prompt = build_chunk_prompt(chunks[index], instruction, index, len(chunks), tail)
+    async with limit:
+        result = await generate_content(prompt, use_cache=use_cache)
+    # An empty answer keeps the chunk's original text
+    if not result.strip():
+        return split_paragraphs(chunks[index])
+    return split_paragraphs(_clean_chunk_output(result))
+
+async def refine_section(original_content: str, instruction: str, use_cache: bool = True) -> str:
+    """
+    Refine a section. Content that fits the model's budget goes out as one
+    prompt; longer content is split on paragraph boundaries into budgeted
+    chunks that are refined concurrently and stitched back together.
+    If any LLM call fails the refinement fails with OllamaError, so a
+    partially refined section is never returned as a success.
+    """
+    original_content = original_content or ""
+    if not needs_chunking(original_content, instruction):
+        return await generate_content(build_refine_prompt(original_content, instruction), use_cache=use_cache)
+
+    chunks = chunk_paragraphs(original_content, chunk_budget(instruction))
+    limit = asyncio.Semaphore(REFINE_CHUNK_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(_refine_chunk(chunks, i, instruction, limit, use_cache))
+        for i in range(len(chunks))
+    ]
+    try:
+        refined = await asyncio.gather(*tasks)
+    finally:
+        # One failed chunk fails the refinement; stop the others
+        for task in tasks:
+            task.cancel()
+    for i in range(1, len(refined)):
+        refined[i] = _drop_repeated(refined[i - 1], refined[i])
+
+    if REFINE_SMOOTH_SEAMS:
+        seams = [i for i in range(1, len(refined)) if refined[i - 1] and refined[i]]
+        smoothed = await asyncio.gather(*(
+            _smooth_seam(refined[i - 1][-1], refined[i][0], instruction, use_cache) for i in seams
+        ))
+        for i, (left, right) in zip(seams, smoothed):
+            refined[i - 1][-1], refined[i][0] = left, right
+
+    return "\n\n".join(paragraph for part in refined for paragraph in part)
+
+async def stream_refine(original_content: str, instruction: str, use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Stream a refinement. Short content streams tokens from a single prompt;
+    long content is refined in concurrent chunks and each chunk is yielded,
+    in order, as soon as it and everything before it are done. Seams are
+    de-duplicated and, with REFINE_SMOOTH_SEAMS, smoothed like refine_section
+    does: a chunk's last paragraph is held back until the seam after it is
+    rewritten. A failed LLM call raises OllamaError mid-stream, so the
+    caller reports an error and saves nothing.
+    """
+    original_content = original_content or ""
+    if not needs_chunking(original_content, instruction):
+        async for token in stream_content(build_refine_prompt(original_content, instruction), use_cache=use_cache):
+            yield token
+        return
+
+    chunks = chunk_paragraphs(original_content, chunk_budget(instruction))
+    limit = asyncio.Semaphore(REFINE_CHUNK_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(_refine_chunk(chunks, i, instruction, limit, use_cache))
+        for i in range(len(chunks))
+    ]
+    try:
+        previous = []  # the last chunk's paragraphs, for de-duplication
+        held = None  # the last paragraph so far, sent once the seam after it is settled
+        sent = False
+        for task in tasks:
+            paragraphs = _drop_repeated(previous, await task)
+            if not paragraphs:
+                continue
+            previous = list(paragraphs)
+            if held is not None and REFINE_SMOOTH_SEAMS:
+                held, paragraphs[0] = await _smooth_seam(held, paragraphs[0], instruction, use_cache)
+            ready = ([held] if held is not None else []) + paragraphs[:-1]
+            held = paragraphs[-1]
+            if ready:
+                yield ("\n\n" if sent else "") + "\n\n".join(ready)
+                sent = True
+        if held is not None:
+            yield ("\n\n" if sent else "") + held
+    finally:
+        for task in tasks:
+            task.cancel()
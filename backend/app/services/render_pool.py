@@ -0,0 +1,125 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from .export_cache import FragmentStore
+
+load_dotenv()
+
+# Worker processes for DOCX/PPTX rendering; 0 renders in the API process instead
+EXPORT_RENDER_WORKERS = int(os.getenv("EXPORT_RENDER_WORKERS", min(os.cpu_count() or 1, 4)))
+# Renders admitted to the pool at once (running + queued); further exports wait
+EXPORT_RENDER_MAX_PENDING = int(os.getenv("EXPORT_RENDER_MAX_PENDING", 32))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_admission = asyncio.Semaphore(EXPORT_RENDER_MAX_PENDING)
+_stats_lock = threading.Lock()
+_stats = {
+    "waiting": 0,  # blocked on admission
+    "in_flight": 0,  # submitted to the pool (running or queued there)
+    "completed": 0,
+    "failed": 0,
+    "render_seconds_total": 0.0,
+    "render_seconds_max": 0.0,
+    "wait_seconds_total": 0.0,
+}
+
+def _init_worker():
+    from .templates import warm_up
+    warm_up()
+
+def _render_to_file(document_type: str, title: str, topic: str, sections: List[dict], directory: str,
+                    fragments: Optional[FragmentStore] = None):
+    """Runs in a worker process: render into a new file in directory."""
+    from .export_engine import render
+    start = time.perf_counter()
+    fd, path = tempfile.mkstemp(dir=directory, suffix=f".{document_type}.tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            counts = render(document_type, title, topic, sections, out, fragments)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, counts, time.perf_counter() - start
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn: never fork the API process with its threads and DB connections
+                _executor = ProcessPoolExecutor(
+                    max_workers=EXPORT_RENDER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+    return _executor
+
+def start():
+    """Start the worker processes ahead of the first export."""
+    if EXPORT_RENDER_WORKERS > 0:
+        executor = get_executor()
+        for _ in range(EXPORT_RENDER_WORKERS):
+            executor.submit(time.sleep, 0)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def render_to_file(document_type: str, title: str, topic: str, sections: List[dict], directory: str,
+                         fragments: Optional[FragmentStore] = None) -> Tuple[str, Tuple[int, int]]:
+    """
+    Render plain project data in the process pool and return the path of the
+    rendered file (created in directory; the caller owns it) and render()'s
+    (reused, rendered) section counts, for the caller to record: metrics
+    incremented in a worker process are never scraped. fragments is the
+    project's section fragment store, if any.
+    """
+    with _stats_lock:
+        _stats["waiting"] += 1
+    try:
+        await _admission.acquire()
+    finally:
+        with _stats_lock:
+            _stats["waiting"] -= 1
+    try:
+        with _stats_lock:
+            _stats["in_flight"] += 1
+        start = time.perf_counter()
+        try:
+            path, counts, render_seconds = await asyncio.get_running_loop().run_in_executor(
+                get_executor(), _render_to_file, document_type, title, topic, sections, directory, fragments
+            )
+        except Exception:
+            with _stats_lock:
+                _stats["failed"] += 1
+            raise
+        finally:
+            with _stats_lock:
+                _stats["in_flight"] -= 1
+        with _stats_lock:
+            _stats["completed"] += 1
+            _stats["render_seconds_total"] += render_seconds
+            _stats["render_seconds_max"] = max(_stats["render_seconds_max"], render_seconds)
+            _stats["wait_seconds_total"] += max(time.perf_counter() - start - render_seconds, 0.0)
+        return path, counts
+    finally:
+        _admission.release()
+
+def stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["workers"] = EXPORT_RENDER_WORKERS
+    stats["queue_depth"] = stats["waiting"] + max(stats["in_flight"] - EXPORT_RENDER_WORKERS, 0)
+    completed = stats["completed"]
+    stats["render_seconds_avg"] = stats["render_seconds_total"] / completed if completed else 0.0
+    stats["wait_seconds_avg"] = stats["wait_seconds_total"] / completed if completed else 0.0
+    return stats
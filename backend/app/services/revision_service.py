@@ -0,0 +1,158 @@
+import difflib
+import hashlib
+import json
+import os
+import zlib
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import func, select, update
+from ..models import Refinement, Section, SectionRevision
+
+load_dotenv()
+
+# Every Nth version is stored as a full snapshot, so rebuilding any version
+# decompresses one snapshot and applies at most N-1 deltas.
+REVISION_KEYFRAME_INTERVAL = int(os.getenv("REVISION_KEYFRAME_INTERVAL", 10))
+REVISION_COMPRESS_LEVEL = int(os.getenv("REVISION_COMPRESS_LEVEL", 6))
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_delta(old: str, new: str) -> list:
+    """Line ops that turn old into new: [start, end] copies old lines, a string is inserted text."""
+    a = old.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(b[j1:j2]))
+    return ops
+
+def apply_delta(old: str, ops: list) -> str:
+    a = old.splitlines(keepends=True)
+    return "".join("".join(a[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+
+def _compress(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), REVISION_COMPRESS_LEVEL)
+
+def _decompress(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+def _latest(db, section_id: int):
+    return db.execute(
+        select(SectionRevision.version, SectionRevision.kind, SectionRevision.content_hash)
+        .where(SectionRevision.section_id == section_id)
+        .order_by(SectionRevision.version.desc())
+        .limit(1)
+    ).first()
+
+def _since_keyframe(db, section_id: int, version: int) -> int:
+    """Number of versions up to `version` since (and including) the latest snapshot."""
+    keyframe = db.execute(
+        select(func.max(SectionRevision.version)).where(
+            SectionRevision.section_id == section_id,
+            SectionRevision.kind == "snapshot",
+            SectionRevision.version <= version,
+        )
+    ).scalar()
+    return version - keyframe + 1 if keyframe is not None else version
+
+def record_revision(db, section: Section, previous: Optional[str], content: str, source: str,
+                    refinement: Optional[Refinement] = None) -> Optional[SectionRevision]:
+    """
+    Append content as the section's next version (caller commits). previous is
+    the section's content before the change. Nothing is recorded if it is unchanged.
+    """
+    new_hash = content_hash(content)
+    # Serialize concurrent writers on this section before reading the latest
+    # version: a no-op UPDATE takes the row lock on Postgres and, on SQLite,
+    # opens the write transaction (pysqlite doesn't for a SELECT, and SQLite
+    # ignores FOR UPDATE), so the next writer waits until this one commits.
+    db.execute(update(Section).where(Section.id == section.id).values(order_index=Section.order_index))
+    latest = _latest(db, section.id)
+    if latest is not None and latest.content_hash == new_hash:
+        return None
+
+    if latest is None and previous:
+        # History starts now: keep what the section held before as version 1
+        db.add(SectionRevision(
+            section_id=section.id, version=1, kind="snapshot", data=_compress(previous),
+            source="initial", size=len(previous), content_hash=content_hash(previous),
+        ))
+        latest = (1, "snapshot", content_hash(previous))
+    version = latest[0] + 1 if latest is not None else 1
+
+    snapshot = _compress(content)
+    kind, data = "snapshot", snapshot
+    # A delta needs previous to be exactly the last recorded version
+    base_ok = previous is not None and latest is not None and latest[2] == content_hash(previous)
+    if base_ok and _since_keyframe(db, section.id, latest[0]) < REVISION_KEYFRAME_INTERVAL:
+        delta = zlib.compress(
+            json.dumps(make_delta(previous, content), separators=(",", ":")).encode("utf-8"),
+            REVISION_COMPRESS_LEVEL,
+        )
+        if len(delta) < len(snapshot):
+            kind, data = "delta", delta
+
+    revision = SectionRevision(
+        section_id=section.id, version=version, kind=kind, data=data, source=source,
+        refinement=refinement, size=len(content), content_hash=new_hash,
+    )
+    db.add(revision)
+    return revision
+
+def rebuild(db, section_id: int, version: int) -> Optional[str]:
+    """Text of one version of a section, or None if it doesn't exist."""
+    keyframe = db.execute(
+        select(func.max(SectionRevision.version)).where(
+            SectionRevision.section_id == section_id,
+            SectionRevision.kind == "snapshot",
+            SectionRevision.version <= version,
+        )
+    ).scalar()
+    if keyframe is None:
+        return None
+    rows = db.execute(
+        select(SectionRevision.version, SectionRevision.kind, SectionRevision.data)
+        .where(
+            SectionRevision.section_id == section_id,
+            SectionRevision.version.between(keyframe, version),
+        )
+        .order_by(SectionRevision.version)
+    ).all()
+    if not rows or rows[-1].version != version:
+        return None
+    text = ""
+    for row in rows:
+        raw = _decompress(row.data)
+        text = raw if row.kind == "snapshot" else apply_delta(text, json.loads(raw))
+    return text
+
+def list_revisions(db, section_id: int) -> List[dict]:
+    """Version metadata (no text) for a section, oldest first."""
+    rows = db.execute(
+        select(
+            SectionRevision.version, SectionRevision.kind, SectionRevision.source,
+            SectionRevision.size, func.length(SectionRevision.data).label("stored_bytes"),
+            SectionRevision.created_at, Refinement.prompt,
+        )
+        .outerjoin(Refinement, Refinement.id == SectionRevision.refinement_id)
+        .where(SectionRevision.section_id == section_id)
+        .order_by(SectionRevision.version)
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+def rollback(db, section: Section, version: int) -> Optional[Tuple[str, Optional[SectionRevision]]]:
+    """
+    Make an earlier version current again (caller commits) and return its text
+    with the new revision, or None if the version doesn't exist. History stays
+    linear: the restored text is recorded as a new version (none if unchanged).
+    """
+    content = rebuild(db, section.id, version)
+    if content is None:
+        return None
+    previous = section.content
+    section.content = content
+    return content, record_revision(db, section, previous, content, "rollback")
@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, Tuple
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from ..database import SessionLocal
+from ..models import GenerationLease
+
+load_dotenv()
+
+# Coalesce across API workers through lease rows (in-process coalescing is always on)
+SINGLEFLIGHT_DB_LEASE = os.getenv("SINGLEFLIGHT_DB_LEASE", "true").lower() == "true"
+# A leader renews its lease while generating; a crashed leader's lease lapses after this
+SINGLEFLIGHT_LEASE_SECONDS = int(os.getenv("SINGLEFLIGHT_LEASE_SECONDS", 30))
+# How long a finished result is handed to duplicates that arrive just after it
+SINGLEFLIGHT_RESULT_TTL = int(os.getenv("SINGLEFLIGHT_RESULT_TTL", 10))
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL", 0.25))
+# Expired lease rows are deleted every N finished generations
+SINGLEFLIGHT_PRUNE_EVERY = int(os.getenv("SINGLEFLIGHT_PRUNE_EVERY", 100))
+
+def make_key(*parts) -> str:
+    """Fingerprint of everything that makes two requests interchangeable."""
+    material = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+# --- Lease rows (run in the threadpool) ---
+def _acquire(key: str, owner: str, fresh: bool = False) -> Tuple[bool, Optional[dict]]:
+    """
+    Try to become the leader for key. Returns (True, None) when the lease is
+    ours, (False, result) when another worker finished it recently, and
+    (False, None) while another worker is still running it. A fresh caller
+    never takes a finished result; it replaces it and runs the generation.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=SINGLEFLIGHT_LEASE_SECONDS)
+        lease = db.get(GenerationLease, key)
+        if lease is None:
+            db.add(GenerationLease(key=key, owner=owner, status="running", expires_at=expires_at))
+            try:
+                db.commit()
+                return True, None
+            except IntegrityError:
+                db.rollback()  # another worker inserted it first
+                return False, None
+        if lease.expires_at <= now:
+            # Lapsed lease (crashed leader) or stale result: take it over
+            claimable = GenerationLease.expires_at <= now
+        elif lease.status != "done":
+            return False, None
+        elif not fresh:
+            return False, json.loads(lease.result)
+        else:
+            claimable = GenerationLease.status == "done"
+        claimed = db.execute(
+            update(GenerationLease)
+            .where(GenerationLease.key == key, claimable)
+            .values(owner=owner, status="running", result=None, expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return bool(claimed), None
+    finally:
+        db.close()
+
+def _renew(key: str, owner: str):
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(GenerationLease)
+            .where(GenerationLease.key == key, GenerationLease.owner == owner, GenerationLease.status == "running")
+            .values(expires_at=datetime.utcnow() + timedelta(seconds=SINGLEFLIGHT_LEASE_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def _finish(key: str, owner: str, result: dict, prune: bool):
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db.execute(
+            update(GenerationLease)
+            .where(GenerationLease.key == key, GenerationLease.owner == owner)
+            .values(status="done", result=json.dumps(result),
+                    expires_at=now + timedelta(seconds=SINGLEFLIGHT_RESULT_TTL))
+            .execution_options(synchronize_session=False)
+        )
+        if prune:
+            db.execute(
+                delete(GenerationLease).where(GenerationLease.expires_at < now)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+    finally:
+        db.close()
+
+def _release(key: str, owner: str):
+    """Drop our lease after a failure so waiting workers can retry."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            delete(GenerationLease).where(GenerationLease.key == key, GenerationLease.owner == owner)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+class SingleFlight:
+    """
+    Runs one generation per key at a time. Duplicates in this process await the
+    leader's future; duplicates in other workers wait on the leader's lease row
+    and read its stored result.
+    """
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._inflight = {}  # key -> asyncio.Future
+        self._lock = threading.Lock()
+        self._finished = 0
+        self.counters = {
+            "leaders": 0,  # requests that ran the generation
+            "coalesced_local": 0,  # shared a leader in this process
+            "coalesced_remote": 0,  # shared a leader in another worker
+            "waited_remote": 0,  # had to wait for another worker's lease
+            "failed": 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    async def _keep_lease(self, key: str):
+        while True:
+            await asyncio.sleep(SINGLEFLIGHT_LEASE_SECONDS / 3)
+            await run_in_threadpool(_renew, key, self.owner)
+
+    async def _lead(self, key: str, produce: Callable[[], Awaitable[dict]], fresh: bool = False) -> dict:
+        if not SINGLEFLIGHT_DB_LEASE:
+            self._count("leaders")
+            return await produce()
+
+        waited = False
+        while True:
+            # Once a fresh caller has waited on a running generation, its result is fresh enough
+            acquired, result = await run_in_threadpool(_acquire, key, self.owner, fresh and not waited)
+            if acquired:
+                break
+            if result is not None:
+                self._count("coalesced_remote")
+                return result
+            if not waited:
+                waited = True
+                self._count("waited_remote")
+            await asyncio.sleep(SINGLEFLIGHT_POLL_INTERVAL)
+
+        self._count("leaders")
+        keepalive = asyncio.create_task(self._keep_lease(key))
+        try:
+            result = await produce()
+        except BaseException:
+            keepalive.cancel()
+            await run_in_threadpool(_release, key, self.owner)
+            raise
+        keepalive.cancel()
+        with self._lock:
+            self._finished += 1
+            prune = self._finished % SINGLEFLIGHT_PRUNE_EVERY == 0
+        await run_in_threadpool(_finish, key, self.owner, result, prune)
+        return result
+
+    async def do(self, key: str, produce: Callable[[], Awaitable[dict]], fresh: bool = False) -> dict:
+        """
+        Return produce()'s result, running it only if no identical call is in
+        flight. With fresh, a result another worker finished recently is not
+        reused; only a generation still in flight is joined.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self._count("coalesced_local")
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception retrieved even if no duplicate ever awaits it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            result = await self._lead(key, produce, fresh)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            self._count("failed")
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["in_flight"] = len(self._inflight)
+        stats["coalesced"] = stats["coalesced_local"] + stats["coalesced_remote"]
+        return stats
+
+singleflight = SingleFlight()
@@ -0,0 +1,140 @@
+import copy
+import io
+import os
+import threading
+from typing import Optional
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.shared import Pt, RGBColor
+from dotenv import load_dotenv
+from pptx import Presentation
+from docx.oxml.ns import qn
+from pptx.oxml.ns import qn as pptx_qn
+
+load_dotenv()
+
+# Optional corporate templates (.docx / .pptx). Defaults to the python-docx /
+# python-pptx built-in templates.
+EXPORT_DOCX_TEMPLATE = os.getenv("EXPORT_DOCX_TEMPLATE") or None
+EXPORT_PPTX_TEMPLATE = os.getenv("EXPORT_PPTX_TEMPLATE") or None
+
+# Paragraph styles used by the DOCX layout. A corporate template can define
+# any of these itself; only missing ones are created.
+TITLE_STYLE = "Export Title"
+TOPIC_STYLE = "Export Topic"
+HEADING_STYLE = "Export Heading"
+SUBHEADING_STYLE = "Export Subheading"
+BODY_STYLE = "Export Body"
+# Built-in list styles (they carry the bullet/number definitions); a template
+# without them gets plain paragraph styles of the same name.
+BULLET_STYLE = "List Bullet"
+NUMBER_STYLE = "List Number"
+
+TITLE_LAYOUT = "Title Slide"
+CONTENT_LAYOUT = "Title and Content"
+
+_templates = {}  # (document_type, path) -> parsed, styled template
+_lock = threading.Lock()
+
+def _add_style(doc, name: str, base: str):
+    if name in [s.name for s in doc.styles]:
+        return None
+    style = doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+    style.base_style = doc.styles[base]
+    style.next_paragraph_style = doc.styles[base]
+    return style
+
+def _prepare_docx(path: Optional[str]):
+    doc = Document(path)
+    # Drop any sample content from the template, keeping the section properties
+    body = doc.element.body
+    for child in list(body):
+        if child.tag != qn("w:sectPr"):
+            body.remove(child)
+
+    style = _add_style(doc, TITLE_STYLE, "Title")
+    if style is not None:
+        style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+    style = _add_style(doc, TOPIC_STYLE, "Normal")
+    if style is not None:
+        style.font.italic = True
+        style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+    style = _add_style(doc, HEADING_STYLE, "Heading 1")
+    if style is not None:
+        style.font.color.rgb = RGBColor(31, 56, 100)
+        style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
+
+    style = _add_style(doc, SUBHEADING_STYLE, "Heading 2")
+    if style is not None:
+        style.font.color.rgb = RGBColor(31, 56, 100)
+
+    _add_style(doc, BULLET_STYLE, "Normal")
+    _add_style(doc, NUMBER_STYLE, "Normal")
+
+    style = _add_style(doc, BODY_STYLE, "Normal")
+    if style is not None:
+        style.font.name = "Calibri"
+        style.font.size = Pt(12)
+        style.paragraph_format.line_spacing = 1.3
+        style.paragraph_format.space_before = Pt(8)
+        style.paragraph_format.space_after = Pt(8)
+        style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
+    return doc
+
+def _prepare_pptx(path: Optional[str]):
+    prs = Presentation(path)
+    # Drop any sample slides from the template
+    slide_ids = prs.slides._sldIdLst
+    for slide_id in list(slide_ids):
+        prs.part.drop_rel(slide_id.rId)
+        slide_ids.remove(slide_id)
+
+    if path is None:
+        # Default bullet text style for the built-in master; corporate
+        # templates keep the styling of their own master.
+        body_style = prs.slide_master.element.find(pptx_qn("p:txStyles")).find(pptx_qn("p:bodyStyle"))
+        def_rpr = body_style.find(pptx_qn("a:lvl1pPr")).find(pptx_qn("a:defRPr"))
+        def_rpr.set("sz", "1600")
+        latin = def_rpr.find(pptx_qn("a:latin"))
+        latin.set("typeface", "Calibri")
+    return prs
+
+def _template(document_type: str, path: Optional[str]):
+    key = (document_type, path)
+    template = _templates.get(key)
+    if template is None:
+        with _lock:
+            template = _templates.get(key)
+            if template is None:
+                prepared = _prepare_docx(path) if document_type == "docx" else _prepare_pptx(path)
+                # Reload the prepared package so the cached object holds no lazily
+                # cached wrappers around inner XML elements: deepcopy copies each
+                # lxml tree root independently, and such wrappers would end up
+                # pointing at detached copies in the clone.
+                buffer = io.BytesIO()
+                prepared.save(buffer)
+                buffer.seek(0)
+                template = Document(buffer) if document_type == "docx" else Presentation(buffer)
+                _templates[key] = template
+    return template
+
+def new_document(path: Optional[str] = EXPORT_DOCX_TEMPLATE):
+    """Return a fresh Document cloned from the parsed, styled template."""
+    return copy.deepcopy(_template("docx", path))
+
+def new_presentation(path: Optional[str] = EXPORT_PPTX_TEMPLATE):
+    """Return a fresh Presentation cloned from the parsed template."""
+    return copy.deepcopy(_template("pptx", path))
+
+def slide_layout(prs, name: str, fallback_index: int):
+    """Find a slide layout by name, falling back to its index in the default template."""
+    layout = prs.slide_layouts.get_by_name(name)
+    return layout if layout is not None else prs.slide_layouts[fallback_index]
+
+def warm_up():
+    """Parse the configured templates ahead of the first export."""
+    _template("docx", EXPORT_DOCX_TEMPLATE)
+    _template("pptx", EXPORT_PPTX_TEMPLATE)
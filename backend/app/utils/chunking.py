@@ -0,0 +1,77 @@
+import os
+import re
+from typing import List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Rough token estimate without a tokenizer; ~4 characters per token for English
+LLM_CHARS_PER_TOKEN = float(os.getenv("LLM_CHARS_PER_TOKEN", 4))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / LLM_CHARS_PER_TOKEN) + 1
+
+def split_paragraphs(text: str) -> List[str]:
+    """Blank-line separated blocks (a markdown list without blank lines stays one block)."""
+    return [p.strip("\n") for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+def _is_heading(paragraph: str) -> bool:
+    line = paragraph.strip()
+    return "\n" not in line and (line.startswith("#") or (line.startswith("**") and line.endswith("**")))
+
+def _split_oversized(paragraph: str, budget: int) -> List[str]:
+    """Split one paragraph that exceeds the budget on sentences, then on characters."""
+    pieces, current = [], ""
+    max_chars = int(budget * LLM_CHARS_PER_TOKEN)
+    for sentence in _SENTENCE_END.split(paragraph):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        candidate = f"{current} {sentence}" if current else sentence
+        if current and estimate_tokens(candidate) > budget:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_paragraphs(text: str, budget: int) -> List[str]:
+    """
+    Pack paragraphs into chunks of at most `budget` estimated tokens, never
+    splitting inside a paragraph unless it alone is over budget. Headings stay
+    with the paragraph that follows them.
+    """
+    blocks = []
+    pending_heading = None
+    for paragraph in split_paragraphs(text):
+        if _is_heading(paragraph):
+            pending_heading = f"{pending_heading}\n\n{paragraph}" if pending_heading else paragraph
+            continue
+        if pending_heading:
+            paragraph = f"{pending_heading}\n\n{paragraph}"
+            pending_heading = None
+        if estimate_tokens(paragraph) > budget:
+            blocks.extend(_split_oversized(paragraph, budget))
+        else:
+            blocks.append(paragraph)
+    if pending_heading:
+        blocks.append(pending_heading)
+
+    chunks, current = [], ""
+    for block in blocks:
+        candidate = f"{current}\n\n{block}" if current else block
+        if current and estimate_tokens(candidate) > budget:
+            chunks.append(current)
+            current = block
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
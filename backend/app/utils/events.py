@@ -0,0 +1,16 @@
+import json
+
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Stop proxies (nginx) and browsers from buffering the event stream
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def media_type_for(fmt: str) -> str:
+    return SSE_MEDIA_TYPE if fmt == "sse" else NDJSON_MEDIA_TYPE
+
+def encode_event(event: str, data: dict, fmt: str) -> str:
+    """Encode one event as a Server-Sent Event or an NDJSON line."""
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, **data}) + "\n"
@@ -0,0 +1,98 @@
+import os
+import re
+from typing import BinaryIO, Iterator, Optional, Tuple
+from urllib.parse import quote
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FILE_CHUNK_SIZE = int(os.getenv("FILE_CHUNK_SIZE", 64 * 1024))
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def content_disposition(filename: str) -> str:
+    """attachment header with an ASCII fallback and an RFC 5987 UTF-8 filename."""
+    fallback = "".join(c if 32 <= ord(c) < 127 and c not in '"\\' else "_" for c in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+def file_size(f: BinaryIO) -> int:
+    """Size of an open file, leaving it positioned at the start."""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" range into inclusive (start, end).
+    Returns None when the header is absent or not a single byte range (the
+    full file is sent) and raises ValueError when the range is unsatisfiable.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":  # suffix range: last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+def iter_file_range(f: BinaryIO, start: int, length: int, chunk_size: int = FILE_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield length bytes of f from start in fixed-size chunks, closing f when done."""
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+def file_download_response(request: Request, f: BinaryIO, media_type: str, filename: str,
+                           etag: Optional[str] = None) -> Response:
+    """
+    Stream an open file as an attachment with Content-Length, ETag and
+    single-range (206) support. Takes ownership of f.
+    """
+    size = file_size(f)
+    headers = {
+        "Content-Disposition": content_disposition(filename),
+        "Accept-Ranges": "bytes",
+    }
+    if etag:
+        headers["ETag"] = f'"{etag}"'
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and (not etag or if_range.strip() != f'"{etag}"'):
+        range_header = None  # representation changed: send it whole
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        f.close()
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_file_range(f, 0, size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        iter_file_range(f, start, end - start + 1), status_code=206, media_type=media_type, headers=headers
+    )
@@ -0,0 +1,97 @@
+"""
+Markdown-ish section text -> compact block model, parsed once when content
+is written and stored in Section.content_blocks for the export renderers.
+
+Blocks (JSON lists):
+    ["h", level, runs]        heading (#..######)
+    ["p", [runs, ...]]        paragraph; one runs list per source line
+    ["ul", [runs, ...]]       bullet list items (-, *, +, •)
+    ["ol", [runs, ...]]       numbered list items (1. / 1))
+Runs: a plain string, or [text, style] with style "b", "i" or "bi".
+"""
+import re
+from typing import List, Union
+
+_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_BULLET = re.compile(r"^\s*[-*+•]\s+(.*)$")
+_NUMBERED = re.compile(r"^\s*\d{1,3}[.)]\s+(.*)$")
+_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_INLINE = re.compile(
+    r"\*\*\*(?P<bi>.+?)\*\*\*"
+    r"|\*\*(?P<b>.+?)\*\*"
+    r"|__(?P<b2>.+?)__"
+    r"|\*(?![\s*])(?P<i>.+?)(?<![\s*])\*"
+    r"|(?<!\w)_(?![\s_])(?P<i2>.+?)(?<![\s_])_(?!\w)"
+)
+
+Run = Union[str, list]
+
+def _add_run(runs: List[Run], text: str, style: str):
+    if not text:
+        return
+    if runs:
+        last = runs[-1]
+        last_text, last_style = (last, "") if isinstance(last, str) else last
+        if last_style == style:
+            runs[-1] = last_text + text if not style else [last_text + text, style]
+            return
+    runs.append(text if not style else [text, style])
+
+def _parse_inline(text: str, style: str, runs: List[Run]):
+    position = 0
+    for match in _INLINE.finditer(text):
+        _add_run(runs, text[position:match.start()], style)
+        kind = next(name for name, value in match.groupdict().items() if value is not None)
+        added = {"bi": "bi", "b": "b", "b2": "b", "i": "i", "i2": "i"}[kind]
+        combined = "".join(flag for flag in "bi" if flag in style or flag in added)
+        _parse_inline(match.group(kind), combined, runs)
+        position = match.end()
+    _add_run(runs, text[position:], style)
+
+def parse_inline(text: str) -> List[Run]:
+    """Split one line into runs, turning **bold**, *italic* (and _/__ forms) into styles."""
+    runs: List[Run] = []
+    _parse_inline(text.strip(), "", runs)
+    return runs
+
+def parse_blocks(content: str) -> list:
+    """Parse section text into the block model described above."""
+    blocks = []
+    current = None  # the open "p", "ul" or "ol" block
+
+    for line in (content or "").replace("\r\n", "\n").split("\n"):
+        if not line.strip():
+            current = None
+            continue
+        heading = _HEADING.match(line)
+        if heading:
+            blocks.append(["h", len(heading.group(1)), parse_inline(heading.group(2))])
+            current = None
+            continue
+        if _RULE.match(line):
+            current = None
+            continue
+        for kind, pattern in (("ul", _BULLET), ("ol", _NUMBERED)):
+            item = pattern.match(line)
+            if item:
+                if current is None or current[0] != kind:
+                    current = [kind, []]
+                    blocks.append(current)
+                current[1].append(parse_inline(item.group(1)))
+                break
+        else:
+            if current is not None and current[0] != "p" and line[:1].isspace():
+                # Indented continuation of the previous list item
+                _parse_inline(f" {line.strip()}", "", current[1][-1])
+                continue
+            if current is None or current[0] != "p":
+                current = ["p", []]
+                blocks.append(current)
+            current[1].append(parse_inline(line))
+    return blocks
+
+def plain_text(runs: List[Run]) -> str:
+    return "".join(run if isinstance(run, str) else run[0] for run in runs)
+
+def run_style(run: Run) -> str:
+    return "" if isinstance(run, str) else run[1]
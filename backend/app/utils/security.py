@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
@@ -12,15 +12,31 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt work factor; hashes made with any other cost are rehashed on next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+MAX_PASSWORD_LENGTH = 72
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
-from fastapi import HTTPException
 
-def get_password_hash(password: str) -> str:
-    if len(password) > 72:
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify, and return a new hash when the stored one uses an outdated work factor."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def check_password_length(password: str):
+    if len(password) > MAX_PASSWORD_LENGTH:
         raise HTTPException(status_code=400, detail="Password must be 72 characters or less.")
+
+def get_password_hash(password: str) -> str:
+    check_password_length(password)
     return pwd_context.hash(password)
 
 
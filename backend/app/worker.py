@@ -0,0 +1,36 @@
+"""
+Standalone job worker: python -m app.worker
+
+Runs queued generation/outline/export jobs without serving the API, so
+workers can be scaled separately (set JOB_WORKER_IN_API=false on API hosts).
+"""
+import asyncio
+import logging
+import os
+
+# Size the DB pool for a few long jobs rather than API traffic
+os.environ.setdefault("DB_PROFILE", "worker")
+
+from .services import llm_service, render_pool
+from .services.job_worker import JobWorker
+
+# Serve /metrics for this worker on its own port (0 = off)
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 0))
+
+async def main():
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("app").setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    if WORKER_METRICS_PORT:
+        from prometheus_client import start_http_server
+        start_http_server(WORKER_METRICS_PORT)
+    worker = JobWorker()
+    llm_service.start()
+    try:
+        await worker.run()
+    finally:
+        await worker.stop()
+        await llm_service.close_client()
+        render_pool.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Bulk project import/clone benchmark.
+
+Creates projects with N sections three ways and reports wall time and
+sections per second:
+
+  per-row   the old create_project path: one ORM add per section, two
+            commits and a re-query
+  bulk      project_service.create_project_with_sections (executemany
+            INSERT ... RETURNING in one transaction)
+  clone     project_service.clone_project (INSERT ... SELECT)
+
+    cd backend
+    python -m bench.bench_bulk_import --sizes 1000 10000
+    python -m bench.bench_bulk_import --database-url postgresql://...
+"""
+import argparse
+import os
+import tempfile
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--content-bytes", type=int, default=500, help="body size per section (0 = no content)")
+    parser.add_argument("--database-url", help="database to use (default: a new SQLite file)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_bulk_'), 'bench.db')}"
+
+    from app import migrations
+    from app.database import SessionLocal
+    from app.models import Project, Section, User
+    from app.services import project_service
+
+    migrations.upgrade()
+    db = SessionLocal()
+    user = User(email=f"bench-{time.time()}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    content = ("lorem ipsum " * (args.content_bytes // 12 + 1))[:args.content_bytes] or None
+
+    def per_row(n):
+        project = Project(user_id=user_id, title="per-row", document_type="pptx", topic="bench")
+        db.add(project)
+        db.commit()
+        db.refresh(project)
+        for i in range(n):
+            db.add(Section(project_id=project.id, title=f"Slide {i}", order_index=i, content=content))
+        db.commit()
+        db.query(Section).filter(Section.project_id == project.id).order_by(Section.order_index).all()
+        return project.id
+
+    def bulk(n):
+        project, _ = project_service.create_project_with_sections(
+            db, user_id, "bulk", "pptx", "bench",
+            [{"title": f"Slide {i}", "order_index": i, "content": content} for i in range(n)]
+        )
+        db.commit()
+        return project.id
+
+    print(f"{'sections':>9} {'method':>8} {'seconds':>9} {'sections/s':>11}")
+    for n in args.sizes:
+        source_id = None
+        for name, run in (("per-row", per_row), ("bulk", bulk)):
+            start = time.perf_counter()
+            source_id = run(n)
+            elapsed = time.perf_counter() - start
+            db.expunge_all()
+            print(f"{n:>9} {name:>8} {elapsed:>9.3f} {n / elapsed:>11.0f}")
+        start = time.perf_counter()
+        project_service.clone_project(db, db.get(Project, source_id), user_id)
+        db.commit()
+        elapsed = time.perf_counter() - start
+        db.expunge_all()
+        print(f"{n:>9} {'clone':>8} {elapsed:>9.3f} {n / elapsed:>11.0f}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Incremental export benchmark.
+
+Renders synthetic projects of several sizes three ways: a full render with
+no stored fragments, a re-render after editing one section (the other
+sections are spliced from their stored fragments), and the same edit with
+fragments disabled. It reports the median time of each and checks that
+the spliced export's XML parts match a full render of the same content.
+
+    cd backend
+    python -m bench.bench_incremental_export --sections 15,30,60,120 --repeat 5
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+import zipfile
+
+WORDS = ("market growth battery charging policy adoption range cost supply demand "
+         "infrastructure consumer emissions grid vehicle manufacturer incentive").split()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", default="15,30,60,120", help="comma-separated project sizes")
+    parser.add_argument("--types", default="docx,pptx")
+    parser.add_argument("--repeat", type=int, default=5, help="edits timed per size")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+def sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+    i = rng.randrange(len(words))
+    words[i] = f"**{words[i]}**"
+    return " ".join(words).capitalize() + "."
+
+def section_text(rng: random.Random) -> str:
+    parts = ["## Overview", " ".join(sentence(rng) for _ in range(4))]
+    parts.append("\n".join(f"- {sentence(rng)}" for _ in range(3)))
+    parts.append(" ".join(sentence(rng) for _ in range(4)))
+    return "\n\n".join(parts)
+
+def xml_parts(data: bytes) -> dict:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return {name: archive.read(name) for name in archive.namelist() if name.endswith((".xml", ".rels"))}
+
+def main():
+    args = parse_args()
+    cache_dir = tempfile.mkdtemp(prefix="bench_fragments_")
+    os.environ["EXPORT_CACHE_DIR"] = cache_dir
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(cache_dir, 'bench.db')}")
+
+    from app.services import export_engine, templates
+    from app.utils.markdown import parse_blocks
+
+    templates.warm_up()
+    rng = random.Random(args.seed)
+
+    def timed(document_type, sections, fragments):
+        out = io.BytesIO()
+        start = time.perf_counter()
+        export_engine.render(document_type, "Bench", "Electric vehicles", sections, out, fragments)
+        return time.perf_counter() - start, out.getvalue()
+
+    print(f"{'type':<6}{'sections':>9}{'full ms':>10}{'edit ms':>10}{'no-frag ms':>12}{'speedup':>9}  identical")
+    project_id = 0
+    for document_type in args.types.split(","):
+        for size in (int(n) for n in args.sections.split(",")):
+            project_id += 1
+            sections = [{"title": f"Section {i + 1}", "blocks": parse_blocks(section_text(rng))} for i in range(size)]
+            full, _ = timed(document_type, sections, export_engine.fragment_store(project_id, document_type))
+
+            edit_times, plain_times, identical = [], [], True
+            for _ in range(args.repeat):
+                index = rng.randrange(size)
+                sections[index] = dict(sections[index], blocks=parse_blocks(section_text(rng)))
+                seconds, spliced = timed(document_type, sections, export_engine.fragment_store(project_id, document_type))
+                edit_times.append(seconds)
+                seconds, fresh = timed(document_type, sections, None)
+                plain_times.append(seconds)
+                identical = identical and xml_parts(spliced) == xml_parts(fresh)
+
+            edit, plain = statistics.median(edit_times), statistics.median(plain_times)
+            print(f"{document_type:<6}{size:>9}{full * 1000:>10.1f}{edit * 1000:>10.1f}{plain * 1000:>12.1f}"
+                  f"{plain / edit:>8.1f}x  {'yes' if identical else 'NO'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Login throughput benchmark.
+
+Registers one user against a throwaway SQLite database, then fires
+concurrent POST /auth/login requests through the ASGI app and reports
+logins per second, logins per second per hashing core, and latency.
+
+    cd backend
+    python -m bench.bench_login --requests 200 --concurrency 32 --workers 2 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 2),
+                        help="PASSWORD_HASH_WORKERS (0 = API thread pool)")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--max-pending", type=int, default=1000, help="PASSWORD_HASH_MAX_PENDING")
+    return parser.parse_args()
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+async def run(args):
+    import httpx
+    from app import migrations
+    from app.main import app
+    from app.services import password_pool
+
+    migrations.upgrade()
+    password_pool.start()
+    credentials = {"email": "bench@example.com", "password": "correct horse battery staple"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/auth/register", json=credentials)
+        # Warm the pool so process start-up isn't measured
+        await client.post("/auth/login", json=credentials)
+
+        latencies, statuses = [], {}
+        gate = asyncio.Semaphore(args.concurrency)
+
+        async def one():
+            async with gate:
+                start = time.perf_counter()
+                response = await client.post("/auth/login", json=credentials)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    password_pool.shutdown()
+    ok = statuses.get(200, 0)
+    cores = max(args.workers, 1)
+    print(f"rounds={args.rounds} workers={args.workers} concurrency={args.concurrency} requests={args.requests}")
+    print(f"statuses:        {statuses}")
+    print(f"elapsed:         {elapsed:.2f}s")
+    print(f"logins/sec:      {ok / elapsed:.1f}")
+    print(f"logins/sec/core: {ok / elapsed / cores:.1f}")
+    print(f"latency p50/p95: {statistics.median(latencies) * 1000:.0f} / {percentile(latencies, 95) * 1000:.0f} ms")
+    print(f"pool:            {password_pool.stats()}")
+
+def main():
+    args = parse_args()
+    db_dir = tempfile.mkdtemp(prefix="bench_login_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_MAX_PENDING"] = str(args.max_pending)
+    os.environ["JOB_WORKER_IN_API"] = "false"
+    os.environ["EXPORT_RENDER_WORKERS"] = "0"
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
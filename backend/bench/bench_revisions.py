@@ -0,0 +1,101 @@
+"""
+Refinement history benchmark.
+
+Applies a series of synthetic refinements (paragraph rewrites, insertions
+and deletions) to one section of a throwaway SQLite database, then reports
+bytes stored per refinement against the old full-copy scheme, and the
+latency of rebuilding random versions.
+
+    cd backend
+    python -m bench.bench_revisions --refinements 200 --paragraphs 30 --keyframe 10
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refinements", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=30, help="paragraphs in the section")
+    parser.add_argument("--edits", type=int, default=2, help="paragraphs rewritten per refinement")
+    parser.add_argument("--keyframe", type=int, default=10, help="REVISION_KEYFRAME_INTERVAL")
+    parser.add_argument("--rebuilds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+WORDS = ("market growth battery charging policy adoption range cost supply demand "
+         "infrastructure consumer emissions grid vehicle manufacturer incentive").split()
+
+def paragraph(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 80))).capitalize() + ".\n"
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_rev_'), 'bench.db')}"
+    os.environ["REVISION_KEYFRAME_INTERVAL"] = str(args.keyframe)
+
+    from app import migrations
+    from app.database import SessionLocal
+    from app.models import Project, Section, User
+    from app.services import revision_service
+    from app.services.generation_service import apply_refinement
+
+    migrations.upgrade()
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    user = User(email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    project = Project(user_id=user.id, title="Bench", document_type="docx", topic="EVs")
+    db.add(project)
+    db.flush()
+    section = Section(project_id=project.id, title="Body", order_index=0)
+    db.add(section)
+    db.commit()
+
+    paragraphs = [paragraph(rng) for _ in range(args.paragraphs)]
+    full_copy_bytes = 0
+    write_seconds = []
+    for i in range(args.refinements):
+        for _ in range(args.edits):
+            paragraphs[rng.randrange(len(paragraphs))] = paragraph(rng)
+        if rng.random() < 0.1:
+            paragraphs.insert(rng.randrange(len(paragraphs) + 1), paragraph(rng))
+        if rng.random() < 0.1 and len(paragraphs) > 1:
+            del paragraphs[rng.randrange(len(paragraphs))]
+        text = "\n".join(paragraphs)
+        full_copy_bytes += len(text.encode("utf-8"))
+        start = time.perf_counter()
+        apply_refinement(db, section, f"refinement {i}", text)
+        db.commit()
+        write_seconds.append(time.perf_counter() - start)
+
+    revisions = revision_service.list_revisions(db, section.id)
+    stored_bytes = sum(r["stored_bytes"] for r in revisions)
+    snapshots = sum(r["kind"] == "snapshot" for r in revisions)
+
+    rebuild_seconds = []
+    for _ in range(args.rebuilds):
+        version = rng.randint(1, len(revisions))
+        start = time.perf_counter()
+        revision_service.rebuild(db, section.id, version)
+        rebuild_seconds.append(time.perf_counter() - start)
+    db.close()
+
+    n = args.refinements
+    print(f"refinements={n} paragraphs={args.paragraphs} edits={args.edits} keyframe={args.keyframe}")
+    print(f"full copies:       {full_copy_bytes:>10} bytes  ({full_copy_bytes / n:.0f} per refinement)")
+    print(f"revision history:  {stored_bytes:>10} bytes  ({stored_bytes / n:.0f} per refinement, "
+          f"{snapshots} snapshots, {full_copy_bytes / stored_bytes:.1f}x smaller)")
+    print(f"write p50/p95:     {statistics.median(write_seconds) * 1000:.2f} / {percentile(write_seconds, 95) * 1000:.2f} ms")
+    print(f"rebuild p50/p95:   {statistics.median(rebuild_seconds) * 1000:.2f} / {percentile(rebuild_seconds, 95) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
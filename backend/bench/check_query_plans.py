@@ -0,0 +1,108 @@
+"""
+Query-plan check for the router hot paths.
+
+Migrates a database (a throwaway SQLite file unless --database-url is given),
+EXPLAINs the queries the routers issue, and fails if any of them scans a
+table or sorts instead of reading rows in index order.
+
+    cd backend
+    python -m bench.check_query_plans
+    python -m bench.check_query_plans --database-url postgresql://...
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="database to check (default: a new SQLite file)")
+    return parser.parse_args()
+
+def router_queries():
+    """(name, statement, index the plan should use or None for the primary key)"""
+    from datetime import datetime
+    from sqlalchemy import and_, func, or_, select
+    from app.models import Project, Section, Refinement
+
+    section_count = (
+        select(func.count(Section.id)).where(Section.project_id == Project.id)
+        .correlate(Project).scalar_subquery()
+    )
+    listing = select(Project.id, Project.title, Project.updated_at, section_count).where(Project.user_id == 1)
+    cursor = datetime(2026, 1, 1)
+
+    return [
+        ("project ownership check (project_router, export_router, job_router)",
+         select(Project).where(Project.id == 1, Project.user_id == 1), None),
+        ("user's projects (ownership scan by user)",
+         select(Project.id).where(Project.user_id == 1).order_by(Project.id), "ix_projects_user_id_id"),
+        ("project listing, first page (GET /projects)",
+         listing.order_by(Project.updated_at.desc(), Project.id.desc()).limit(21),
+         "ix_projects_user_id_updated_at_id"),
+        ("project listing, next page (GET /projects?cursor=)",
+         listing.where(or_(Project.updated_at < cursor, and_(Project.updated_at == cursor, Project.id < 10)))
+         .order_by(Project.updated_at.desc(), Project.id.desc()).limit(21),
+         "ix_projects_user_id_updated_at_id"),
+        ("project sections in order (get_project, export, jobs)",
+         select(Section).where(Section.project_id == 1).order_by(Section.order_index),
+         "ix_sections_project_id_order_index"),
+        ("bulk generation section list (generate_router)",
+         select(Section.id, Section.title).where(Section.project_id == 1).order_by(Section.order_index),
+         "ix_sections_project_id_order_index"),
+        ("section ownership via project (generate_router)",
+         select(Section).join(Project).where(Section.id == 1, Project.user_id == 1), None),
+        ("section within project (feedback/comment)",
+         select(Section).where(Section.id == 1, Section.project_id == 1), None),
+        ("section refinement history",
+         select(Refinement).where(Refinement.section_id == 1).order_by(Refinement.created_at),
+         "ix_refinements_section_id_created_at"),
+    ]
+
+def explain(conn, stmt) -> list:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {sql}")]
+
+def problems(dialect: str, plan: list, index) -> list:
+    found = []
+    text = "\n".join(plan)
+    if dialect == "sqlite":
+        found += [line for line in plan if line.startswith("SCAN ")]
+        found += [line for line in plan if "TEMP B-TREE" in line]
+    else:
+        found += [line.strip() for line in plan if "Seq Scan" in line or line.strip().startswith("Sort")]
+    if index is not None and index not in text:
+        found.append(f"{index} not used")
+    return found
+
+def main():
+    args = parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='plans_'), 'plans.db')}"
+
+    from app import migrations
+    from app.database import engine
+
+    migrations.upgrade()
+    failed = 0
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # Tiny tables always favour a seq scan; we want to know whether an index *can* serve the query
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, stmt, index in router_queries():
+            plan = explain(conn, stmt)
+            issues = problems(conn.dialect.name, plan, index)
+            failed += bool(issues)
+            print(f"[{'FAIL' if issues else 'ok'}] {name}")
+            for line in plan:
+                print(f"       {line}")
+            for issue in issues:
+                print(f"    !! {issue}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Deterministic stand-in for Ollama's /api/generate and /api/tags.
+
+The same prompt always yields the same text. Outline prompts ("headings",
+"slide titles") get one heading per line. Streaming and non-streaming
+responses use Ollama's shapes, including the eval_count / eval_duration
+timing fields. Latency is modelled as a prompt delay (--latency) plus
+--tokens output tokens at --tokens-per-second. --failure-rate makes that
+fraction of requests fail: non-streaming requests with a 500, streaming
+requests with an error chunk half-way through.
+
+    cd backend
+    python -m bench.fake_ollama --port 11434 --latency 0.05 --tokens-per-second 200 --tokens 120
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from dataclasses import dataclass
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = ("market growth battery charging policy adoption range cost supply demand infrastructure "
+         "consumer emissions grid vehicle manufacturer incentive analysis strategy outlook").split()
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.05  # seconds before the first token
+    tokens_per_second: float = 200.0  # 0 = all tokens at once
+    tokens: int = 120  # output tokens per response
+    outline_items: int = 6
+    failure_rate: float = 0.0
+    model: str = "gemma:2b"
+    seed: int = 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_config_args(parser)
+    return parser.parse_args(argv)
+
+def add_config_args(parser, prefix: str = ""):
+    """Fake backend options, shared with the load test (which prefixes them with 'fake-')."""
+    defaults = FakeConfig()
+    parser.add_argument(f"--{prefix}latency", type=float, default=defaults.latency, help="seconds to first token")
+    parser.add_argument(f"--{prefix}tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument(f"--{prefix}tokens", type=int, default=defaults.tokens, help="output tokens per response")
+    parser.add_argument(f"--{prefix}outline-items", type=int, default=defaults.outline_items)
+    parser.add_argument(f"--{prefix}failure-rate", type=float, default=defaults.failure_rate)
+    parser.add_argument(f"--{prefix}seed", type=int, default=defaults.seed)
+
+def config_from_args(args, prefix: str = "") -> FakeConfig:
+    prefix = prefix.replace("-", "_")
+    return FakeConfig(**{
+        field: getattr(args, prefix + field)
+        for field in ("latency", "tokens_per_second", "tokens", "outline_items", "failure_rate", "seed")
+    })
+
+def render_text(prompt: str, config: FakeConfig) -> list:
+    """The response for prompt, as a list of tokens (words with their trailing separator)."""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    if "headings" in prompt or "slide titles" in prompt:
+        lines = [" ".join(rng.choice(WORDS) for _ in range(3)).title() for _ in range(config.outline_items)]
+        return [line + "\n" for line in lines]
+    tokens = []
+    for i in range(config.tokens):
+        word = rng.choice(WORDS)
+        end = "\n\n" if i % 40 == 39 else ("." if i % 12 == 11 else "")
+        tokens.append(word + end + ("" if end.endswith("\n") else " "))
+    return tokens
+
+def create_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    failures = random.Random(config.seed)
+    app.state.requests = 0
+
+    def timings(prompt: str, count: int, elapsed: float) -> dict:
+        return {
+            "total_duration": int(elapsed * 1e9),
+            "prompt_eval_count": len(prompt.split()),
+            "prompt_eval_duration": int(config.latency * 1e9),
+            "eval_count": count,
+            "eval_duration": max(int((elapsed - config.latency) * 1e9), 1),
+        }
+
+    @app.get("/api/tags")
+    def tags():
+        return {"models": [{"name": config.model}]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        prompt = body.get("prompt", "")
+        model = body.get("model", config.model)
+        app.state.requests += 1
+        tokens = render_text(prompt, config)
+        fail = failures.random() < config.failure_rate
+        delay = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0
+        start = time.perf_counter()
+
+        if not body.get("stream", True):
+            await asyncio.sleep(config.latency + delay * len(tokens))
+            if fail:
+                return JSONResponse({"error": "fake backend failure"}, status_code=500)
+            return {
+                "model": model, "response": "".join(tokens), "done": True,
+                **timings(prompt, len(tokens), time.perf_counter() - start),
+            }
+
+        async def chunks():
+            await asyncio.sleep(config.latency)
+            for i, token in enumerate(tokens):
+                if fail and i == len(tokens) // 2:
+                    yield json.dumps({"error": "fake backend failure"}) + "\n"
+                    return
+                if delay:
+                    await asyncio.sleep(delay)
+                yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+            yield json.dumps({
+                "model": model, "response": "", "done": True,
+                **timings(prompt, len(tokens), time.perf_counter() - start),
+            }) + "\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    return app
+
+def main():
+    import uvicorn
+
+    args = parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
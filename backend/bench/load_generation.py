@@ -0,0 +1,206 @@
+"""
+Generation path load test.
+
+Starts bench.fake_ollama in-process on a free port (or targets --backend),
+uses a throwaway SQLite database, and drives the generation endpoints
+through the ASGI app at a fixed concurrency:
+
+    outline  POST /generate/outline
+    content  POST /generate/content               (a different section per request)
+    refine   POST /generate/refine                (a different section per request)
+    project  POST /generate/project/{id}/generate (--project-sections sections each)
+
+Each scenario reports requests, errors, throughput and p50/p95/p99 latency.
+Non-200 responses (LLM failures are 502s) count as errors, and so do
+project runs with failed sections. The LLM cache is off unless --cached is
+given. --json writes the results so they can be compared between releases.
+
+    cd backend
+    python -m bench.load_generation --requests 200 --concurrency 16 --fake-latency 0.05 --json run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+
+from bench.fake_ollama import add_config_args, config_from_args, create_app
+
+SCENARIOS = ("outline", "content", "refine", "project")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated, run in this order")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario (project: --projects)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--projects", type=int, default=20, help="project generations in the project scenario")
+    parser.add_argument("--project-sections", type=int, default=8)
+    parser.add_argument("--cached", action="store_true", help="leave the LLM response cache on")
+    parser.add_argument("--backend", help="use this Ollama-compatible URL instead of the in-process fake")
+    parser.add_argument("--json", help="write results to this file")
+    add_config_args(parser, prefix="fake-")
+    return parser.parse_args()
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)] if values else 0.0
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def summarize(name, latencies, errors, elapsed, upstream) -> dict:
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "upstream_requests": upstream,
+    }
+
+async def drive(name, calls, concurrency, fake_app) -> dict:
+    """Await every call (a coroutine factory returning ok) at the given concurrency."""
+    latencies, errors = [], 0
+    gate = asyncio.Semaphore(concurrency)
+    upstream_before = fake_app.state.requests if fake_app is not None else None
+
+    async def one(call):
+        nonlocal errors
+        async with gate:
+            start = time.perf_counter()
+            ok = await call()
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(call) for call in calls))
+    elapsed = time.perf_counter() - start
+    upstream = fake_app.state.requests - upstream_before if fake_app is not None else None
+    return summarize(name, latencies, errors, elapsed, upstream)
+
+def body_ok(response) -> bool:
+    if response.status_code != 200:
+        return False
+    data = response.json()
+    return not (isinstance(data, dict) and data.get("result") == "partial")
+
+async def run(args, backend_url: str, fake_app):
+    import httpx
+    from app import migrations
+    from app.main import app
+    from app.services import llm_service
+
+    migrations.upgrade()
+    fresh = not args.cached
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        credentials = {"email": "load@example.com", "password": "load-test-password"}
+        await client.post("/auth/register", json=credentials)
+        token = (await client.post("/auth/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async def import_project(sections: int) -> dict:
+            response = await client.post("/projects/bulk", headers=headers, json={
+                "title": "Load test", "document_type": "docx", "topic": "Electric vehicle adoption",
+                "sections": [{"title": f"Section {i + 1}"} for i in range(sections)],
+            })
+            response.raise_for_status()
+            return response.json()
+
+        async def post(url, payload=None):
+            return body_ok(await client.post(url, json=payload, headers=headers))
+
+        # One section per request so duplicate coalescing doesn't hide load
+        main_project = await import_project(args.requests)
+        section_ids = [s["id"] for s in main_project["sections"]]
+
+        for name in args.scenarios.split(","):
+            if name == "outline":
+                calls = [lambda: post("/generate/outline", {"project_id": main_project["id"], "fresh": fresh})
+                         for _ in range(args.requests)]
+            elif name == "content":
+                calls = [lambda sid=sid: post("/generate/content", {"section_id": sid, "fresh": fresh})
+                         for sid in section_ids]
+            elif name == "refine":
+                calls = [lambda sid=sid: post("/generate/refine", {
+                    "section_id": sid, "prompt": "Make it more concise", "fresh": fresh
+                }) for sid in section_ids]
+            elif name == "project":
+                projects = [await import_project(args.project_sections) for _ in range(args.projects)]
+                calls = [lambda pid=p["id"]: post(f"/generate/project/{pid}/generate?fresh={str(fresh).lower()}")
+                         for p in projects]
+            else:
+                raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+            results.append(await drive(name, calls, args.concurrency, fake_app))
+
+    await llm_service.close_client()
+    return results
+
+def report(args, backend_url, results):
+    fake = config_from_args(args, prefix="fake-")
+    print(f"backend={backend_url} concurrency={args.concurrency} cached={args.cached}")
+    if not args.backend:
+        print(f"fake: latency={fake.latency}s tokens={fake.tokens} tokens/s={fake.tokens_per_second} "
+              f"failure_rate={fake.failure_rate}")
+    print(f"{'scenario':<10}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'upstream':>10}")
+    for r in results:
+        upstream = "-" if r["upstream_requests"] is None else r["upstream_requests"]
+        print(f"{r['scenario']:<10}{r['requests']:>9}{r['errors']:>8}{r['throughput_rps']:>9}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{upstream:>10}")
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump({
+                "backend": backend_url,
+                "concurrency": args.concurrency,
+                "cached": args.cached,
+                "fake": None if args.backend else vars(fake),
+                "scenarios": results,
+            }, out, indent=2)
+
+async def main_async(args):
+    import uvicorn
+
+    fake_app = server = None
+    backend_url = args.backend
+    if not backend_url:
+        port = free_port()
+        fake_app = create_app(config_from_args(args, prefix="fake-"))
+        server = uvicorn.Server(uvicorn.Config(fake_app, host="127.0.0.1", port=port, log_level="warning"))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        backend_url = f"http://127.0.0.1:{port}"
+
+    os.environ["LLM_BACKENDS"] = backend_url
+    try:
+        results = await run(args, backend_url, fake_app)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await serving
+    report(args, backend_url, results)
+
+def main():
+    args = parse_args()
+    db_dir = tempfile.mkdtemp(prefix="bench_load_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ["LLM_CACHE_ENABLED"] = str(args.cached).lower()
+    os.environ["LLM_HEALTH_INTERVAL"] = "0"
+    # Injected failures would otherwise log a warning each
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    os.environ["JOB_WORKER_IN_API"] = "false"
+    os.environ["EXPORT_RENDER_WORKERS"] = "0"
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()